@@ -1,7 +1,12 @@
 import cv2 as cv
+import numpy as np
 import time
 import os
 
+from tools.chessboard import find_corners
+from tools.calibration import IncrementalCalibrator
+from tools.capture import open_frame_source
+
 # --- Configuration ---
 # Define the directory where the captured photos will be saved.
 output_dir = "captured_photos"
@@ -11,23 +16,34 @@ output_dir = "captured_photos"
 frame_width = 1280
 frame_height = 720
 
+# Frame source: a camera index, a video file, an image directory such as 'captured_photos'
+# or 'synthetic' for rendered chessboard footage. Recorded sources are replayed at their own
+# frame rate when `realtime` is set, or as fast as possible to measure throughput.
+frame_source = 0
+realtime = True
+
 # Define the maximum number of photos to capture.
 max_photos = 30
 
+# Live calibration: detect the chessboard in every captured photo and update the calibration
+# incrementally, so the current estimate is shown while capturing.
+live_calibration = True
+chessboard_size = (9, 6)
+square_size = 0.0265  # 26.5 mm
+# Write the final live calibration to 'calibration_results.npz' when capturing stops.
+save_live_calibration = False
+
 # --- Setup ---
 # Create the output directory if it doesn't already exist.
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
     print(f"Created directory: {output_dir}")
 
-# Initialize the video capture object.
+# Initialize the video capture object and set the resolution of the video stream.
 # The argument `0` refers to the default webcam. If you have multiple,
 # you might need to change this to 1, 2, etc.
-cap = cv.VideoCapture(0)
-
-# Set the resolution of the video stream.
-cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
-cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
+# A live camera is read on a background thread, so the loop always gets the newest frame.
+cap = open_frame_source(frame_source, frame_width, frame_height, realtime)
 
 # Check if the webcam was opened successfully.
 if not cap.isOpened():
@@ -41,6 +57,8 @@ print("Press 'Spacebar' to capture a photo.")
 # Initialize the photo counter.
 photo_count = 0
 
+calibrator = IncrementalCalibrator(chessboard_size, square_size) if live_calibration else None
+
 # --- Main Loop ---
 while True:
     # Read a frame from the webcam.
@@ -51,8 +69,18 @@ while True:
         print("Error: Failed to read frame from webcam.")
         break
 
-    # Display the live video feed.
-    cv.imshow('Webcam Live Feed', frame)
+    # Display the live video feed, with the current calibration estimate if there is one.
+    if calibrator is not None and calibrator.calibrated:
+        display = frame.copy()
+        fx, fy = calibrator.camera_matrix[0, 0], calibrator.camera_matrix[1, 1]
+        cx, cy = calibrator.camera_matrix[0, 2], calibrator.camera_matrix[1, 2]
+        cv.putText(display, f"views {len(calibrator.image_points)}  rms {calibrator.rms:.3f}px",
+                   (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        cv.putText(display, f"fx {fx:.1f}  fy {fy:.1f}  cx {cx:.1f}  cy {cy:.1f}",
+                   (10, 60), cv.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        cv.imshow('Webcam Live Feed', display)
+    else:
+        cv.imshow('Webcam Live Feed', frame)
 
     # Check for a key press.
     key = cv.waitKey(1) & 0xFF
@@ -68,6 +96,16 @@ while True:
         cv.imwrite(filename, frame)
         photo_count += 1
         print(f"Photo {photo_count} of {max_photos} captured and saved as: {filename}")
+
+        # Feed the new view to the live calibration.
+        if calibrator is not None:
+            gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+            corners = find_corners(gray, chessboard_size)
+            if corners is None:
+                print("Chessboard not found, photo not used for live calibration.")
+            elif calibrator.add_view(corners, gray.shape[::-1]):
+                print(f"Live calibration from {len(calibrator.image_points)} views: "
+                      f"RMS {calibrator.rms:.3f}px, solved in {1000 * calibrator.solve_time:.1f} ms")
         
     # Exit the loop if the maximum number of photos has been reached or 'q' is pressed.
     if key == ord('q') or photo_count >= max_photos:
@@ -79,3 +117,14 @@ while True:
 cap.release()
 cv.destroyAllWindows()
 print("Webcam released and all windows closed.")
+print(f"Capture: {cap.stats()}")
+
+# Finish the live calibration with a full refinement over every view.
+if calibrator is not None and calibrator.calibrated:
+    calibrator.refine()
+    print(f"\nLive calibration ({len(calibrator.image_points)} views, RMS {calibrator.rms:.3f}px):")
+    print(calibrator.camera_matrix)
+    print(calibrator.dist_coeffs)
+    if save_live_calibration:
+        np.savez('calibration_results.npz', camera_matrix=calibrator.camera_matrix, dist_coeffs=calibrator.dist_coeffs)
+        print("Calibration results saved to 'calibration_results.npz'.")
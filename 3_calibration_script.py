@@ -1,6 +1,12 @@
 import numpy as np
 import cv2 as cv
 import glob
+import time
+
+from tools.chessboard import board_object_points, find_corners, detect_corners_parallel, CornerCache
+from tools.video import video_frames, candidate_frames
+from tools.undistort import undistort_maps
+from tools.calibration import select_views, reprojection_rms, reprojection_errors, reject_outlier_views
 
 # --- 1. Define Chessboard Parameters ---
 # Number of inner corners on the chessboard.
@@ -11,107 +17,255 @@ chessboard_size = (9, 6)
 # This is used to calculate the real-world 3D coordinates of the corners.
 square_size = 0.0265  # 26.5 mm
 
-# --- 2. Setup Object and Image Points ---
-# Object points are the 3D coordinates of the chessboard corners in the real world.
-# We assume the chessboard is on the Z=0 plane for simplicity.
-# This array will be the same for all images.
-object_points = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
-object_points[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2) * square_size
-
-# Arrays to store the 3D object points and 2D image points from all calibration images.
-all_object_points = []  # 3D points in the real world
-all_image_points = []  # 2D points in the image plane
-
-# --- 3. Find Chessboard Corners in Images ---
-# Get the list of all image files in the 'calibration_images' folder.
-images = glob.glob('captured_photos/*.jpg')
-
-# Check if any images were found.
-if not images:
-    print("Error: No images found in the 'calibration_images' directory.")
-    print("Please add your chessboard photos to this folder and try again.")
-    exit()
-
-# Loop through each image to find the chessboard corners.
-for i, filename in enumerate(images):
-    print(f"Processing image {i+1}/{len(images)}: {filename}")
-    
-    # Read the image in grayscale for corner detection.
-    img = cv.imread(filename)
-    if img is None:
-        print(f"Warning: Could not read image {filename}. Skipping.")
-        continue
-    
-    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
-    
-    # Find the chessboard corners.
-    # The `cv.CALIB_CB_ADAPTIVE_THRESH` flag improves corner detection in varying lighting conditions.
-    ret, corners = cv.findChessboardCorners(gray, chessboard_size, None, cv.CALIB_CB_ADAPTIVE_THRESH + cv.CALIB_CB_FAST_CHECK + cv.CALIB_CB_NORMALIZE_IMAGE)
-    
-    # If a full set of corners was found, refine them and add to our lists.
-    if ret:
-        # Refine the corners to sub-pixel accuracy.
-        # This increases the accuracy of the calibration.
-        criteria = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 30, 0.001)
-        corners_refined = cv.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
-        
-        # Add the points to our lists.
-        all_object_points.append(object_points)
-        all_image_points.append(corners_refined)
-        
-        # Optionally, draw the found corners on the image to visualize the detection.
-        cv.drawChessboardCorners(img, chessboard_size, corners_refined, ret)
-        cv.imshow('Corners Found', img)
-        cv.waitKey(500) # Wait for 500 milliseconds
+# Coarse-to-fine detection: search for the board on a downscaled pyramid level whose longest
+# side is at most this many pixels, then refine the corners at full resolution.
+# Set to None to run findChessboardCorners on the full-resolution image.
+pyramid_max_side = None
+
+# Streaming ingest: calibrate straight from a recorded video instead of 'captured_photos/'.
+# Frames are decoded one at a time and only sharp, steady frames showing a new board pose are
+# passed to corner detection. Set to None to use the photos.
+video_path = None
+# Only score every n-th frame of the video.
+video_frame_step = 2
+
+# Headless batch mode: detect corners over a process pool without any preview windows.
+# Useful for large calibration sets where the 500 ms preview per image dominates the run time.
+headless = False
+# Number of worker processes for headless mode (None uses every CPU core).
+num_workers = None
+
+# Cache refined corners on disk so unchanged images skip decoding and detection on re-runs.
+# Entries are keyed by image content, board size and the sub-pixel settings; unused ones are pruned.
+use_cache = True
+cache_dir = '.corner_cache'
+
+# Coverage-aware view selection: calibrate from at most this many views, chosen for image-plane
+# coverage and board pose diversity. Set to None to calibrate from every view.
+max_calibration_views = None
+# When views were selected, also solve with every view and compare solve time and RMS.
+compare_view_selection = True
+
+# Outlier rejection: repeatedly drop the worst views and re-solve, warm-started from the previous
+# result, until every view's RMS reprojection error is below this many pixels.
+# Set to None to keep every view.
+max_view_error = None
+
+# Precompute undistortion maps for these frame sizes (width, height) and alpha values and store
+# them in 'calibration_maps/' next to the results, so consumers can memory-map them at startup.
+undistort_map_sizes = [(1280, 720)]
+undistort_alphas = [1.0]
+
+
+def main():
+    # --- 2. Setup Object and Image Points ---
+    # Object points are the 3D coordinates of the chessboard corners in the real world.
+    # We assume the chessboard is on the Z=0 plane for simplicity.
+    # This array will be the same for all images.
+    object_points = board_object_points(chessboard_size, square_size)
+
+    # Arrays to store the 3D object points and 2D image points from all calibration images.
+    all_object_points = []  # 3D points in the real world
+    all_image_points = []  # 2D points in the image plane
+    all_view_files = []  # image file of each view
+    image_size = None
+
+    # --- 3. Find Chessboard Corners in Images ---
+    # Get the list of all image files in the 'calibration_images' folder.
+    images = glob.glob('captured_photos/*.jpg') if video_path is None else []
+    sample_img = None
+
+    # Check if any images were found.
+    if video_path is None and not images:
+        print("Error: No images found in the 'calibration_images' directory.")
+        print("Please add your chessboard photos to this folder and try again.")
+        return
+
+    cache = CornerCache(cache_dir, max_side=pyramid_max_side) if use_cache and video_path is None else None
+
+    if video_path is not None:
+        # Stream the video; only candidate frames reach corner detection, and only corners are kept.
+        print(f"Streaming frames from '{video_path}'...")
+        start = time.perf_counter()
+        candidates = 0
+        for index, frame, gray in candidate_frames(video_frames(video_path, video_frame_step)):
+            candidates += 1
+            image_size = gray.shape[::-1]
+            corners_refined = find_corners(gray, chessboard_size, max_side=pyramid_max_side)
+            if corners_refined is None:
+                continue
+            if sample_img is None:
+                sample_img = frame.copy()
+            all_object_points.append(object_points)
+            all_image_points.append(corners_refined)
+            all_view_files.append(f"{video_path}#{index}")
+            print(f"Frame {index}: chessboard found ({len(all_image_points)} views)")
+        print(f"Kept {len(all_image_points)} views from {candidates} candidate frames "
+              f"in {time.perf_counter() - start:.1f} s")
+    elif headless:
+        # Fan the detection out over a process pool; results come back in input order.
+        print(f"Detecting corners in {len(images)} images (headless)...")
+        results, images_per_sec = detect_corners_parallel(images, chessboard_size, num_workers,
+                                                          cache=cache, max_side=pyramid_max_side)
+        for filename, (corners_refined, size) in zip(images, results):
+            if size is None:
+                print(f"Warning: Could not read image {filename}. Skipping.")
+                continue
+            image_size = size
+            if corners_refined is None:
+                print(f"Warning: Chessboard corners not found in {filename}. Skipping this image.")
+                continue
+            all_object_points.append(object_points)
+            all_image_points.append(corners_refined)
+            all_view_files.append(filename)
+        print(f"Corner detection: {images_per_sec:.1f} images/sec")
     else:
-        print(f"Warning: Chessboard corners not found in {filename}. Skipping this image.")
+        start = time.perf_counter()
+        # Loop through each image to find the chessboard corners.
+        for i, filename in enumerate(images):
+            print(f"Processing image {i+1}/{len(images)}: {filename}")
+
+            # Reuse the corners from a previous run if this image has not changed.
+            cached = cache.get(filename, chessboard_size) if cache is not None else None
+            if cached is not None:
+                corners_refined, image_size = cached
+                if corners_refined is not None:
+                    all_object_points.append(object_points)
+                    all_image_points.append(corners_refined)
+                    all_view_files.append(filename)
+                else:
+                    print(f"Warning: Chessboard corners not found in {filename}. Skipping this image.")
+                continue
+
+            # Read the image in grayscale for corner detection.
+            img = cv.imread(filename)
+            if img is None:
+                print(f"Warning: Could not read image {filename}. Skipping.")
+                continue
+
+            gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+            image_size = gray.shape[::-1]
+
+            # Find the chessboard corners and refine them to sub-pixel accuracy.
+            # This increases the accuracy of the calibration.
+            corners_refined = find_corners(gray, chessboard_size, max_side=pyramid_max_side)
+            if cache is not None:
+                cache.put(filename, chessboard_size, corners_refined, image_size)
+
+            # If a full set of corners was found, add them to our lists.
+            if corners_refined is not None:
+                all_object_points.append(object_points)
+                all_image_points.append(corners_refined)
+                all_view_files.append(filename)
 
-# Close the visualization window after the loop.
-cv.destroyAllWindows()
+                # Optionally, draw the found corners on the image to visualize the detection.
+                cv.drawChessboardCorners(img, chessboard_size, corners_refined, True)
+                cv.imshow('Corners Found', img)
+                cv.waitKey(500) # Wait for 500 milliseconds
+            else:
+                print(f"Warning: Chessboard corners not found in {filename}. Skipping this image.")
 
-# --- 4. Calibrate the Camera ---
-# Perform the calibration using the collected points.
-# This function returns the camera matrix, distortion coefficients,
-# rotation vectors, and translation vectors.
-print("\nStarting camera calibration...")
-if len(all_object_points) > 0:
+        # Close the visualization window after the loop.
+        cv.destroyAllWindows()
+        print(f"Corner detection: {len(images) / (time.perf_counter() - start):.1f} images/sec")
+
+    if cache is not None:
+        removed = cache.prune()
+        print(f"Corner cache: {cache.hits} hits, {cache.misses} misses, {removed} stale entries removed")
+
+    # --- 4. Calibrate the Camera ---
+    # Perform the calibration using the collected points.
+    # This function returns the camera matrix, distortion coefficients,
+    # rotation vectors, and translation vectors.
+    print("\nStarting camera calibration...")
+    if len(all_object_points) == 0:
+        print("Error: No valid chessboard images were found. Calibration cannot be performed.")
+        return
+
+    # Optionally keep only a bounded, diverse subset of the views to bound the solve time.
+    views = list(range(len(all_image_points)))
+    if max_calibration_views is not None and len(views) > max_calibration_views:
+        views = select_views(object_points, all_image_points, image_size, max_calibration_views)
+        print(f"Selected {len(views)} of {len(all_image_points)} views for calibration.")
+
+    start = time.perf_counter()
     ret, camera_matrix, dist_coeffs, rvecs, tvecs = cv.calibrateCamera(
-        all_object_points, all_image_points, gray.shape[::-1], None, None)
-else:
-    print("Error: No valid chessboard images were found. Calibration cannot be performed.")
-    exit()
-
-# --- 5. Save the Results ---
-# Save the camera matrix and distortion coefficients to a file.
-# The `calibration_results.npz` file can then be loaded by other scripts.
-np.savez('calibration_results.npz', camera_matrix=camera_matrix, dist_coeffs=dist_coeffs)
-print("\nCalibration successful!")
-print("Camera Matrix:")
-print(camera_matrix)
-print("\nDistortion Coefficients:")
-print(dist_coeffs)
-print("\nCalibration results saved to 'calibration_results.npz'. You can now use this file for image and video undistortion.")
-
-# --- 6. Optional: Undistort a sample image for verification ---
-# Load a new image to verify the calibration.
-sample_image_path = images[0]
-sample_img = cv.imread(sample_image_path)
-h, w = sample_img.shape[:2]
-
-# Get the optimal camera matrix for undistortion.
-new_camera_matrix, roi = cv.getOptimalNewCameraMatrix(camera_matrix, dist_coeffs, (w, h), 1, (w, h))
-
-# Undistort the image.
-undistorted_img = cv.undistort(sample_img, camera_matrix, dist_coeffs, None, new_camera_matrix)
-
-# Crop the image to the valid ROI to remove black borders.
-x, y, w, h = roi
-undistorted_img_cropped = undistorted_img[y:y+h, x:x+w]
-
-# Display both the original and undistorted images.
-cv.imshow('Original Image', sample_img)
-cv.imshow('Undistorted Image', undistorted_img_cropped)
-cv.waitKey(0)
-
-# Final cleanup
-cv.destroyAllWindows()
+        [all_object_points[i] for i in views], [all_image_points[i] for i in views], image_size, None, None)
+    solve_time = time.perf_counter() - start
+
+    if compare_view_selection and len(views) < len(all_image_points):
+        start = time.perf_counter()
+        ret_full, camera_matrix_full, dist_coeffs_full, _, _ = cv.calibrateCamera(
+            all_object_points, all_image_points, image_size, None, None)
+        full_time = time.perf_counter() - start
+        # Evaluate the subset intrinsics on every view so both RMS values cover the same data.
+        subset_rms_all = reprojection_rms(object_points, all_image_points, camera_matrix, dist_coeffs)
+        print(f"All {len(all_image_points)} views: solve {1000 * full_time:.1f} ms, RMS {ret_full:.4f}px")
+        print(f"Subset of {len(views)} views: solve {1000 * solve_time:.1f} ms, RMS {ret:.4f}px "
+              f"({subset_rms_all:.4f}px over all views)")
+        print(f"Intrinsic difference (fx, fy, cx, cy): "
+              f"{np.round(camera_matrix[[0, 1, 0, 1], [0, 1, 2, 2]] - camera_matrix_full[[0, 1, 0, 1], [0, 1, 2, 2]], 3)}")
+
+    # Per-view reprojection errors, optionally dropping the worst views until all pass the threshold.
+    view_points = [all_image_points[i] for i in views]
+    if max_view_error is not None:
+        kept, (ret, camera_matrix, dist_coeffs, rvecs, tvecs), view_errors = reject_outlier_views(
+            object_points, view_points, image_size, (ret, camera_matrix, dist_coeffs, rvecs, tvecs), max_view_error)
+        print(f"Outlier rejection dropped {len(views) - len(kept)} views, RMS now {ret:.4f}px")
+        views = [views[i] for i in kept]
+    else:
+        _, view_errors = reprojection_errors(object_points, view_points, rvecs, tvecs, camera_matrix, dist_coeffs)
+    print("Worst views (RMS reprojection error):")
+    for i in np.argsort(view_errors)[::-1][:5]:
+        print(f"  {view_errors[i]:.4f}px  {all_view_files[views[i]]}")
+
+    # --- 5. Save the Results ---
+    # Save the camera matrix and distortion coefficients to a file, along with the RMS
+    # reprojection error of every view used for the calibration.
+    # The `calibration_results.npz` file can then be loaded by other scripts.
+    np.savez('calibration_results.npz', camera_matrix=camera_matrix, dist_coeffs=dist_coeffs,
+             per_view_errors=view_errors, view_files=np.array([all_view_files[i] for i in views]))
+    print("\nCalibration successful!")
+    print("Camera Matrix:")
+    print(camera_matrix)
+    print("\nDistortion Coefficients:")
+    print(dist_coeffs)
+    print("\nCalibration results saved to 'calibration_results.npz'. You can now use this file for image and video undistortion.")
+
+    for size in undistort_map_sizes:
+        for alpha in undistort_alphas:
+            undistort_maps(camera_matrix, dist_coeffs, size, alpha)
+    if undistort_map_sizes:
+        print(f"Undistortion maps for {undistort_map_sizes} saved to 'calibration_maps/'.")
+
+    if headless:
+        return
+
+    # --- 6. Optional: Undistort a sample image for verification ---
+    # Load a new image to verify the calibration.
+    if sample_img is None:
+        sample_image_path = images[0]
+        sample_img = cv.imread(sample_image_path)
+    h, w = sample_img.shape[:2]
+
+    # Get the optimal camera matrix and the undistortion maps, precomputed if available.
+    map1, map2, new_camera_matrix, roi = undistort_maps(camera_matrix, dist_coeffs, (w, h), 1.0)
+
+    # Undistort the image.
+    undistorted_img = cv.remap(sample_img, map1, map2, cv.INTER_LINEAR)
+
+    # Crop the image to the valid ROI to remove black borders.
+    x, y, w, h = roi
+    undistorted_img_cropped = undistorted_img[y:y+h, x:x+w]
+
+    # Display both the original and undistorted images.
+    cv.imshow('Original Image', sample_img)
+    cv.imshow('Undistorted Image', undistorted_img_cropped)
+    cv.waitKey(0)
+
+    # Final cleanup
+    cv.destroyAllWindows()
+
+
+if __name__ == '__main__':
+    main()
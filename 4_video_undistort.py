@@ -1,6 +1,9 @@
 import cv2 as cv
 import numpy as np
 
+from tools.undistort import Undistorter
+from tools.capture import open_frame_source
+
 # --- 1. Load Calibration Data ---
 try:
     with np.load('calibration_results.npz') as file:
@@ -13,24 +16,34 @@ except FileNotFoundError:
     exit()
 
 # --- 2. Initialize Video Capture ---
+# Set a fixed resolution for the video stream for consistent processing.
+# You can change these values as needed.
+frame_width = 1280
+frame_height = 720
+# Frame source: a camera index, a video file, an image directory such as 'captured_photos'
+# or 'synthetic' for rendered chessboard footage. Recorded sources are replayed at their own
+# frame rate when `realtime` is set, or as fast as possible to measure throughput.
+frame_source = 0
+realtime = True
+
 # Use the default webcam. Change the index if you have multiple cameras.
-cap = cv.VideoCapture(0)
+# A live camera is read on a background thread, so the loop always gets the newest frame.
+cap = open_frame_source(frame_source, frame_width, frame_height, realtime)
 
 if not cap.isOpened():
     print("Error: Could not open webcam.")
     exit()
 
-# Set a fixed resolution for the video stream for consistent processing.
-# You can change these values as needed.
-frame_width = 1280
-frame_height = 720
-cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
-cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
+# The source may not deliver the requested resolution (e.g. a recorded video).
+frame_width = int(cap.get(cv.CAP_PROP_FRAME_WIDTH))
+frame_height = int(cap.get(cv.CAP_PROP_FRAME_HEIGHT))
 
-# Get the new optimal camera matrix and a region of interest.
-# The optimal matrix is the best fit for undistorting the images.
-new_camera_matrix, roi = cv.getOptimalNewCameraMatrix(camera_matrix, dist_coeffs, (frame_width, frame_height), 1, (frame_width, frame_height))
-x, y, w, h = roi
+# Get the new optimal camera matrix, a region of interest and the undistortion maps.
+# The optimal matrix is the best fit for undistorting the images. The maps are memory-mapped
+# from 'calibration_maps/' when the calibration script precomputed them for this resolution,
+# and cut down to the ROI so cropped pixels are never computed.
+undistorter = Undistorter(camera_matrix, dist_coeffs, (frame_width, frame_height), 1.0)
+x, y, w, h = undistorter.roi
 print(f"Optimal Camera Matrix created. ROI (x, y, w, h): ({x}, {y}, {w}, {h})")
 
 print("Press 'q' to quit the application.")
@@ -42,11 +55,8 @@ while True:
         print("Error: Failed to read frame from webcam.")
         break
     
-    # a) Undistort the frame
-    undistorted_frame = cv.undistort(frame, camera_matrix, dist_coeffs, None, new_camera_matrix)
-    
-    # b) Crop the region of interest from the undistorted frame
-    cropped_frame = undistorted_frame[y:y+h, x:x+w]
+    # Undistort the region of interest of the frame into a preallocated buffer.
+    cropped_frame = undistorter(frame)
 
     # Display both the original and the undistorted/cropped frames for comparison
     cv.imshow('Original Frame', frame)
@@ -60,3 +70,4 @@ while True:
 cap.release()
 cv.destroyAllWindows()
 print("Webcam released and all windows closed.")
+print(f"Capture: {cap.stats()}")
@@ -1,6 +1,9 @@
 import cv2 as cv
 import numpy as np
 
+from tools.chessboard import find_corners, ChessboardTracker, FlowPoseTracker
+from tools.capture import open_frame_source
+
 # --- 1. Load Camera Calibration Data ---
 try:
     with np.load('calibration_results.npz') as file:
@@ -16,6 +19,19 @@ except FileNotFoundError:
 # Chessboard inner corners
 chessboard_size = (9, 6)
 
+# Coarse-to-fine detection: search for the board on a downscaled pyramid level whose longest
+# side is at most this many pixels, then refine the corners at full resolution.
+# Set to None to run findChessboardCorners on the full-resolution frame.
+pyramid_max_side = None
+# ROI tracking: search a padded region around the previous corners first, and rate-limit
+# full-frame searches while the board is not visible. Set to False to search every full frame.
+roi_tracking = True
+# Optical-flow pose tracking: between detections, follow the corners with Lucas-Kanade flow and
+# re-solve the pose from the previous one. A full detection still runs every `redetect_every`
+# frames or as soon as the flow loses corners. Set to False to detect the board in every frame.
+flow_tracking = True
+redetect_every = 15
+
 # The real-world 3D coordinates of the chessboard corners.
 # We assume the chessboard is on the Z=0 plane.
 objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
@@ -28,19 +44,26 @@ model_points = np.float32([[0,0,0], [0,1,0], [1,1,0], [1,0,0],
                            [0,0,-1], [0,1,-1], [1,1,-1], [1,0,-1]])
 
 # --- 3. Initialize Video Capture ---
-cap = cv.VideoCapture(0)
+# Set a fixed resolution for consistent processing
+frame_width = 1280
+frame_height = 720
+# Frame source: a camera index, a video file, an image directory such as 'captured_photos'
+# or 'synthetic' for rendered chessboard footage. Recorded sources are replayed at their own
+# frame rate when `realtime` is set, or as fast as possible to measure throughput.
+frame_source = 0
+realtime = True
+# A live camera is read on a background thread, so the loop always gets the newest frame.
+cap = open_frame_source(frame_source, frame_width, frame_height, realtime)
 
 if not cap.isOpened():
     print("Error: Could not open webcam.")
     exit()
 
-# Set a fixed resolution for consistent processing
-frame_width = 1280
-frame_height = 720
-cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
-cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
-
 # --- 4. Main Loop for Rendering ---
+tracker = ChessboardTracker(chessboard_size, max_side=pyramid_max_side) if roi_tracking else None
+pose_tracker = FlowPoseTracker(chessboard_size, objp, camera_matrix, dist_coeffs, tracker, pyramid_max_side,
+                               redetect_every) if flow_tracking else None
+
 print("Press 'q' to quit.")
 while True:
     ret, frame = cap.read()
@@ -50,15 +73,30 @@ while True:
 
     gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
     
-    # Find the chessboard corners in the current frame.
-    ret_corners, corners = cv.findChessboardCorners(gray, chessboard_size, None)
+    # Find the board pose in the current frame.
+    if pose_tracker is not None:
+        pose = pose_tracker.update(gray)
+        ret_corners = pose is not None
+        if ret_corners:
+            rvec, tvec = pose
+    else:
+        # Find the chessboard corners in the current frame.
+        if tracker is not None:
+            corners = tracker.track(gray)
+            ret_corners = corners is not None
+        elif pyramid_max_side is not None:
+            corners = find_corners(gray, chessboard_size, max_side=pyramid_max_side, fallback=False)
+            ret_corners = corners is not None
+        else:
+            ret_corners, corners = cv.findChessboardCorners(gray, chessboard_size, None)
 
-    # If the corners are found, proceed with pose estimation and rendering.
-    if ret_corners:
-        # Get the rotation and translation vectors using solvePnP.
-        # This function estimates the pose of the chessboard relative to the camera.
-        ret_solvepnp, rvec, tvec = cv.solvePnP(objp, corners, camera_matrix, dist_coeffs)
+        if ret_corners:
+            # Get the rotation and translation vectors using solvePnP.
+            # This function estimates the pose of the chessboard relative to the camera.
+            ret_solvepnp, rvec, tvec = cv.solvePnP(objp, corners, camera_matrix, dist_coeffs)
 
+    # If the pose is found, proceed with rendering.
+    if ret_corners:
         # Project the 3D model points onto the 2D image plane.
         # This transforms our 3D cube coordinates into 2D pixel coordinates.
         image_points, _ = cv.projectPoints(model_points, rvec, tvec, camera_matrix, dist_coeffs)
@@ -84,3 +122,8 @@ while True:
 cap.release()
 cv.destroyAllWindows()
 print("Webcam released and all windows closed.")
+print(f"Capture: {cap.stats()}")
+if tracker is not None:
+    print(f"Chessboard tracking: {tracker.stats()}")
+if pose_tracker is not None:
+    print(f"Pose tracking: {pose_tracker.stats()}")
@@ -1,6 +1,9 @@
 import cv2 as cv
 import numpy as np
-from stl import mesh
+
+from tools.chessboard import find_corners, ChessboardTracker, FlowPoseTracker
+from tools.capture import open_frame_source
+from tools.mesh import load_mesh, fit_vertices, MeshRenderer
 
 # --- 1. Load Camera Calibration Data ---
 try:
@@ -16,26 +19,22 @@ except FileNotFoundError:
 # --- 2. Load 3D Model from STL file ---
 try:
     # Load the STL file. Make sure your STL file is in the same directory as this script.
-    model_mesh = mesh.Mesh.from_file('model.stl')
-    
-    # Extract vertices from the STL mesh
-    model_vertices = model_mesh.vectors.reshape(-1, 3)
+    # It is split into unique vertices and a face index array, so every vertex is projected only
+    # once per frame. The preprocessed mesh is cached in '.mesh_cache/' keyed by the file
+    # contents, so later starts skip parsing.
+    model_vertices, model_faces, model_normals, model_bounds = load_mesh('model.stl')
     
     # Normalize the model's coordinates to fit the chessboard square size.
-    # We will scale the STL model to fit within a similar unit square.
-    max_coords = np.max(model_vertices, axis=0)
-    min_coords = np.min(model_vertices, axis=0)
-    model_size = max_coords - min_coords
-    scale = 3.0 / max(model_size)
-    
-    # Center the model's origin to the center of its base and apply scaling.
-    model_vertices = (model_vertices - min_coords - model_size/2) * scale
-    
-    # Create the transformed faces array for drawing.
-    # We use the scaled vertices to create the faces for rendering.
-    model_faces = model_vertices.reshape(-1, 3, 3)
+    # Center the model's origin to the center of its bounding box and scale it to 3 squares.
+    model_vertices = fit_vertices(model_vertices, model_bounds, 3.0)
     
-    print("3D model loaded and prepared.")
+    print(f"3D model loaded and prepared: {len(model_vertices)} vertices, {len(model_faces)} faces.")
+
+    # The overlay culls faces turned away from the camera, paints the rest far to near and
+    # shades them by their angle to the camera, all on the CPU.
+    model_color = (0, 255, 0)
+    cull_back_faces = True
+    renderer = MeshRenderer(model_vertices, model_faces, model_normals, model_color, cull=cull_back_faces)
 
 except FileNotFoundError:
     print("Error: 'model.stl' not found.")
@@ -44,22 +43,42 @@ except FileNotFoundError:
 
 # --- 3. Define Chessboard Points ---
 chessboard_size = (9, 6)
+# Coarse-to-fine detection: search for the board on a downscaled pyramid level whose longest
+# side is at most this many pixels, then refine the corners at full resolution.
+# Set to None to run findChessboardCorners on the full-resolution frame.
+pyramid_max_side = None
+# ROI tracking: search a padded region around the previous corners first, and rate-limit
+# full-frame searches while the board is not visible. Set to False to search every full frame.
+roi_tracking = True
+# Optical-flow pose tracking: between detections, follow the corners with Lucas-Kanade flow and
+# re-solve the pose from the previous one. A full detection still runs every `redetect_every`
+# frames or as soon as the flow loses corners. Set to False to detect the board in every frame.
+flow_tracking = True
+redetect_every = 15
 # The real-world 3D coordinates of the chessboard inner corners.
 objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
 objp[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2)
 
 # --- 4. Initialize Video Capture ---
-cap = cv.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
 # Set a fixed resolution for consistent processing
 frame_width = 1280
 frame_height = 720
-cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
-cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
+# Frame source: a camera index, a video file, an image directory such as 'captured_photos'
+# or 'synthetic' for rendered chessboard footage. Recorded sources are replayed at their own
+# frame rate when `realtime` is set, or as fast as possible to measure throughput.
+frame_source = 0
+realtime = True
+# A live camera is read on a background thread, so the loop always gets the newest frame.
+cap = open_frame_source(frame_source, frame_width, frame_height, realtime)
+if not cap.isOpened():
+    print("Error: Could not open webcam.")
+    exit()
 
 # --- 5. Main Loop for Rendering ---
+tracker = ChessboardTracker(chessboard_size, max_side=pyramid_max_side) if roi_tracking else None
+pose_tracker = FlowPoseTracker(chessboard_size, objp, camera_matrix, dist_coeffs, tracker, pyramid_max_side,
+                               redetect_every) if flow_tracking else None
+
 print("Press 'q' to quit.")
 while True:
     ret, frame = cap.read()
@@ -68,26 +87,31 @@ while True:
         break
     gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
     
-    # Find the chessboard corners in the current frame.
-    ret_corners, corners = cv.findChessboardCorners(gray, chessboard_size, None)
-    
+    # Find the board pose in the current frame.
+    if pose_tracker is not None:
+        pose = pose_tracker.update(gray)
+        ret_corners = pose is not None
+        if ret_corners:
+            rvec, tvec = pose
+    else:
+        # Find the chessboard corners in the current frame.
+        if tracker is not None:
+            corners = tracker.track(gray)
+            ret_corners = corners is not None
+        elif pyramid_max_side is not None:
+            corners = find_corners(gray, chessboard_size, max_side=pyramid_max_side, fallback=False)
+            ret_corners = corners is not None
+        else:
+            ret_corners, corners = cv.findChessboardCorners(gray, chessboard_size, None)
+
+        if ret_corners:
+            # Get the rotation and translation vectors using solvePnP.
+            ret_solvepnp, rvec, tvec = cv.solvePnP(objp, corners, camera_matrix, dist_coeffs)
+
+    # If the pose is found, proceed with rendering.
     if ret_corners:
-        # Get the rotation and translation vectors using solvePnP.
-        ret_solvepnp, rvec, tvec = cv.solvePnP(objp, corners, camera_matrix, dist_coeffs)
-        
-        # Project all the model's vertices onto the 2D image plane.
-        image_points, _ = cv.projectPoints(model_vertices, rvec, tvec, camera_matrix, dist_coeffs)
-        image_points = np.int32(image_points).reshape(-1, 2)
-        
-        # Draw the 3D model (faces) on the frame.
-        for face in model_faces:
-            # The projected face points are taken directly from the projected vertices.
-            projected_face = np.array([
-                image_points[np.where(np.all(model_vertices == face[0], axis=1))[0][0]],
-                image_points[np.where(np.all(model_vertices == face[1], axis=1))[0][0]],
-                image_points[np.where(np.all(model_vertices == face[2], axis=1))[0][0]]
-            ])
-            cv.fillPoly(frame, [projected_face], (0, 255, 0))
+        # Draw the visible faces of the 3D model, shaded and in depth order, on the frame.
+        renderer.draw(frame, rvec, tvec, camera_matrix, dist_coeffs)
             
     # Display the final frame with the rendered model.
     cv.imshow('3D Model on Chessboard', frame)
@@ -100,3 +124,8 @@ while True:
 cap.release()
 cv.destroyAllWindows()
 print("Webcam released and all windows closed.")
+print(f"Capture: {cap.stats()}")
+if tracker is not None:
+    print(f"Chessboard tracking: {tracker.stats()}")
+if pose_tracker is not None:
+    print(f"Pose tracking: {pose_tracker.stats()}")
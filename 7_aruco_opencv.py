@@ -1,17 +1,23 @@
 import numpy as np
 import cv2 as cv
 
+from tools.capture import open_frame_source
+
+# Frame source: a camera index, a video file, an image directory such as 'captured_photos'
+# or 'synthetic' for rendered chessboard footage. Recorded sources are replayed at their own
+# frame rate when `realtime` is set, or as fast as possible to measure throughput.
+frame_source = 0
+realtime = True
+
 # --- 1. Main Loop for Detection ---
 def main():
-    # Initialize webcam with OpenCV
-    cap = cv.VideoCapture(0)
+    # Initialize the frame source (webcam by default)
+    frame_width = 1280
+    frame_height = 720
+    cap = open_frame_source(frame_source, frame_width, frame_height, realtime)
     if not cap.isOpened():
         print("Error: Could not open webcam.")
         return
-    frame_width = 1280
-    frame_height = 720
-    cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
-    cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
     
     # --- ArUco Setup ---
     aruco_dict = cv.aruco.getPredefinedDictionary(cv.aruco.DICT_6X6_250)
@@ -67,6 +73,7 @@ def main():
             
     cap.release()
     cv.destroyAllWindows()
+    print(f"Capture: {cap.stats()}")
         
 if __name__ == '__main__':
     main()
@@ -3,27 +3,21 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
-from stl import mesh
+
+from tools.mesh import load_mesh, fit_vertices
 
 # --- 1. Load 3D Model from STL file ---
 try:
     # Load the STL file. Make sure your STL file is in the same directory as this script.
-    model_mesh = mesh.Mesh.from_file('model2.stl')
-    
-    # Extract vertices from the STL mesh
-    model_vertices = model_mesh.vectors.reshape(-1, 3)
+    # The preprocessed mesh is cached in '.mesh_cache/' keyed by the file contents.
+    model_vertices, model_indices, model_normals, model_bounds = load_mesh('model2.stl')
     
     # Normalize the model's coordinates for a good starting size and position.
-    max_coords = np.max(model_vertices, axis=0)
-    min_coords = np.min(model_vertices, axis=0)
-    model_size = max_coords - min_coords
-    scale = 1.0 / max(model_size)
-    
     # Center the model and apply scaling.
-    model_vertices = (model_vertices - min_coords - model_size / 2) * scale
+    model_vertices = fit_vertices(model_vertices, model_bounds, 1.0)
     
     # Create the transformed faces array for drawing.
-    model_faces = model_vertices.reshape(-1, 3, 3)
+    model_faces = model_vertices[model_indices]
     
     print("3D model loaded and prepared.")
 
@@ -2,21 +2,21 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import cv2
-import cv2.aruco as aruco
-from PIL import Image
 import numpy as np
-import imutils
 import sys
+import time
 
  
-from tools.Visualize import draw_axis
 from tools.objloader import * #Load obj and corresponding material and textures.
+from tools.textures import StreamingTexture
 from tools.matrixTrans import extrinsic2ModelView, intrinsic2Project
-from tools.Filter import Filter
+from tools.capture import open_frame_source
+from tools.marker_tracking import MarkerPoseWorker
 
 
 class AR_render:
-    def __init__(self, camera_matrix, dist_coefs, id_to_model, model_scale_dict):
+    def __init__(self, camera_matrix, dist_coefs, id_to_model, model_scale_dict, frame_source=0, realtime=True,
+                 model_budget=256 << 20, background_pbo=False, mark_size=0.06, show_debug=False):
         """[Initialize]
         
         Arguments:
@@ -24,22 +24,36 @@ class AR_render:
             dist_coefs {[np.array]} -- [your camera difference parameters]
             id_to_model {[dict]} -- [dictionary mapping marker IDs to model paths]
             model_scale {[float]} -- [your model scale size]
+
+        Keyword Arguments:
+            frame_source {int or string} -- [camera index, video file, image directory or 'synthetic'] (default: {0})
+            realtime {bool} -- [replay recorded sources at their frame rate] (default: {True})
+            model_budget {int} -- [GPU memory for models, the least recently seen are unloaded beyond it] (default: {256 MB})
+            background_pbo {bool} -- [upload the camera frames through pixel buffer objects] (default: {False})
+            mark_size {float} -- [aruco mark size: unit is meter] (default: {0.06})
+            show_debug {bool} -- [show the frames with the marker axes in an OpenCV window] (default: {False})
         """
         # Initialise webcam and start thread
-        self.webcam = cv2.VideoCapture(0)
+        self.webcam = open_frame_source(frame_source, realtime=realtime)
         self.image_w, self.image_h = map(int, (self.webcam.get(3), self.webcam.get(4)))
         self.initOpengl(self.image_w, self.image_h)
+        # One background texture for the whole session, refilled with every frame.
+        self.background = StreamingTexture(pbo=background_pbo)
         self.cam_matrix, self.dist_coefs = camera_matrix, dist_coefs
         self.projectMatrix = intrinsic2Project(camera_matrix, self.image_w, self.image_h, 0.01, 100.0)
+        self.project_size = (self.image_w, self.image_h)
+        # Detection and pose estimation run on their own thread, the GLUT loop only draws.
+        self.mark_size, self.show_debug = mark_size, show_debug
+        self.tracker = MarkerPoseWorker(self.webcam, camera_matrix, dist_coefs, mark_size, debug=show_debug)
+        self.tracker.start()
         self.id_to_model = id_to_model
-        self.models = {id: OBJ(path, swapyz=True) for id, path in id_to_model.items()}
+        # Models load in the background when their marker first shows up.
+        self.models = ModelCache(id_to_model, swapyz=True, budget_bytes=model_budget)
         self.model_scale_dict = model_scale_dict
         # Model translate that you can adjust by key board 'w', 's', 'a', 'd'
         self.translate_x, self.translate_y, self.translate_z = 0, 0, 0
         self.pre_extrinsicMatrix = {}
         
-        self.filter = Filter()
-        
 
     def loadModel(self, object_path):
         
@@ -97,12 +111,19 @@ class AR_render:
         
  
     def draw_scene(self):
-        """[Opengl render loop]
+        """[Opengl render loop, drawing the newest frame of the detection thread at the display rate]
         """
-        _, image = self.webcam.read()# get image from webcam camera.
-        self.draw_background(image)  # draw background
+        image, debug_image, fresh = self.tracker.latest_frame()
+        if image is None:
+            time.sleep(0.001)  # no frame processed yet, leave the worker the CPU
+            return
+        display_time = time.perf_counter()
+        self.draw_background(image if fresh else None)  # draw background
         # glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        self.draw_objects(image, mark_size = 0.06) # draw the 3D objects.
+        self.draw_objects(image, display_time) # draw the 3D objects.
+        if self.show_debug and fresh:
+            cv2.imshow("Frame", debug_image)
+            cv2.waitKey(1)
         glutSwapBuffers()
     
         
@@ -114,11 +135,11 @@ class AR_render:
  
  
  
-    def draw_background(self, image):
+    def draw_background(self, image=None):
         """[Draw the background and tranform to opengl format]
         
-        Arguments:
-            image {[np.array]} -- [frame from your camera]
+        Keyword Arguments:
+            image {[np.array]} -- [new frame from your camera, None draws the last one again] (default: {None})
         """
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         # Setting background image project_matrix and model_matrix.
@@ -128,20 +149,10 @@ class AR_render:
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
      
-        # Convert image to OpenGL texture format
-        bg_image = cv2.flip(image, 0)
-        bg_image = Image.fromarray(bg_image)     
-        ix = bg_image.size[0]
-        iy = bg_image.size[1]
-        bg_image = bg_image.tobytes("raw", "BGRX", 0, -1)
-  
-  
-        # Create background texture
-        texid = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texid)
-        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
-        glTexImage2D(GL_TEXTURE_2D, 0, 3, ix, iy, 0, GL_RGBA, GL_UNSIGNED_BYTE, bg_image)
+        # Update the background texture in place, the frame's first row is at t = 0.
+        if image is not None:
+            self.background.update(image)
+        glBindTexture(GL_TEXTURE_2D, self.background.texid)
                 
         glTranslatef(0.0,0.0,-10.0)
         glBegin(GL_QUADS)
@@ -155,51 +166,52 @@ class AR_render:
  
  
  
-    def draw_objects(self, image, mark_size=0.01):
-        """[draw models with opengl]
+    def draw_objects(self, image, display_time):
+        """[draw models with opengl at the marker poses of the detection thread]
         
         Arguments:
             image {[np.array]} -- [frame from your camera]
-        
-        Keyword Arguments:
-            mark_size {float} -- [aruco mark size: unit is meter] (default: {0.01})
+            display_time {[float]} -- [time the poses are extrapolated to, time.perf_counter clock]
         """
-        # aruco data
-        aruco_dict = aruco.getPredefinedDictionary(aruco.DICT_6X6_250)
-        parameters = aruco.DetectorParameters()
-        parameters.adaptiveThreshConstant = 7.0
-
         height, width, channels = image.shape
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        corners, ids, _ = aruco.detectMarkers(gray, aruco_dict, parameters=parameters)
-
-        projectMatrix = intrinsic2Project(self.cam_matrix, width, height, 0.01, 100.0)
+        if self.project_size != (width, height):
+            self.projectMatrix = intrinsic2Project(self.cam_matrix, width, height, 0.01, 100.0)
+            self.project_size = (width, height)
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
-        glMultMatrixf(projectMatrix)
+        glMultMatrixf(self.projectMatrix)
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
 
-        if ids is not None and corners is not None:
-            rvecs, tvecs, _ = aruco.estimatePoseSingleMarkers(corners, mark_size, self.cam_matrix, self.dist_coefs)
-            for i, marker_id in enumerate(ids.flatten()):
-                if marker_id in self.models:
-                    rvec = rvecs[i]
-                    tvec = tvecs[i]
-                    draw_axis(image, rvec, tvec, self.cam_matrix, self.dist_coefs)
-                    if self.filter.update(tvec):
-                        model_matrix = extrinsic2ModelView(rvec, tvec)
-                        self.pre_extrinsicMatrix[marker_id] = model_matrix
-                    else:
-                        model_matrix = self.pre_extrinsicMatrix.get(marker_id)
-                    if model_matrix is not None:
-                        glLoadMatrixf(model_matrix)
-                        scale = self.model_scale_dict.get(marker_id, 0.01)  # Default scale if not found
-                        glScaled(scale, scale, scale)
-                        glTranslatef(self.translate_x, self.translate_y, self.translate_z)
-                        glCallList(self.models[marker_id].gl_list)
-        cv2.imshow("Frame", image)
-        cv2.waitKey(20)
+        for marker_id, (rvec, tvec) in self.tracker.poses(display_time).items():
+            if marker_id in self.models:
+                # Each marker keeps one matrix buffer, refilled every frame.
+                model_matrix = self.pre_extrinsicMatrix.get(marker_id)
+                if model_matrix is None:
+                    model_matrix = self.pre_extrinsicMatrix[marker_id] = np.empty(16)
+                extrinsic2ModelView(rvec, tvec, out=model_matrix)
+                glLoadMatrixf(model_matrix)
+                model = self.models.get(marker_id)
+                if model is not None:
+                    scale = self.model_scale_dict.get(marker_id, 0.01)  # Default scale if not found
+                    glScaled(scale, scale, scale)
+                    glTranslatef(self.translate_x, self.translate_y, self.translate_z)
+                    model.render()
+                elif self.models.loading(marker_id):
+                    self.draw_placeholder(self.mark_size)
+
+    def draw_placeholder(self, size):
+        """[Draw a wire cube standing on the marker while its model loads]
+
+        Arguments:
+            size {[float]} -- [cube edge: unit is meter]
+        """
+        glDisable(GL_TEXTURE_2D)
+        glColor3f(1.0, 1.0, 0.0)
+        glTranslatef(0.0, 0.0, size / 2)
+        glutWireCube(size)
+        glColor3f(1.0, 1.0, 1.0)
+        glEnable(GL_TEXTURE_2D)
 
     def keyBoardListener(self, key, x, y):
         """[Use key board to adjust model size and position]
@@ -255,5 +267,7 @@ if __name__ == "__main__":
         0: 0.01,  # scale for marker 0
         1: 0.03   # scale for marker 1
     }
-    ar_instance = AR_render(cam_matrix, dist_coeff, id_to_model, model_scale_dict)
+    # Show the camera frames with the detected marker axes in an OpenCV window.
+    show_debug = False
+    ar_instance = AR_render(cam_matrix, dist_coeff, id_to_model, model_scale_dict, show_debug=show_debug)
     ar_instance.run()
\ No newline at end of file
@@ -0,0 +1,91 @@
+# Compare the per-frame cost and memory growth of the AR background upload paths in an offscreen
+# OpenGL context: the original conversion through cv2.flip and PIL into a new texture every frame,
+# and the streaming texture refilled with glTexSubImage2D, directly or through pixel buffer objects.
+# With a software renderer such as Mesa's llvmpipe textures live in process memory, so the leak of
+# the original path shows up in the resident set size.
+# Run from the repository root: python -m benchmarks.bench_background_upload
+import os
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+import time
+
+import cv2
+import numpy as np
+from OpenGL.GL import *
+from PIL import Image
+
+from benchmarks.bench_obj_render import create_context
+from tools.textures import StreamingTexture
+
+# --- Configuration ---
+frame_size = (1280, 720)
+num_frames = 600
+unique_frames = 30
+
+
+class LegacyBackground:
+    # The texture handling of the original AR_render.draw_background.
+    def update(self, image):
+        bg_image = cv2.flip(image, 0)
+        bg_image = Image.fromarray(bg_image)
+        ix = bg_image.size[0]
+        iy = bg_image.size[1]
+        bg_image = bg_image.tobytes("raw", "BGRX", 0, -1)
+        self.texid = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texid)
+        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, 3, ix, iy, 0, GL_RGBA, GL_UNSIGNED_BYTE, bg_image)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def resident_mb():
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def draw(background, image):
+    glClear(GL_COLOR_BUFFER_BIT)
+    background.update(image)
+    glBindTexture(GL_TEXTURE_2D, background.texid)
+    glBegin(GL_QUADS)
+    glTexCoord2f(0.0, 1.0); glVertex2f(-1.0, -1.0)
+    glTexCoord2f(1.0, 1.0); glVertex2f( 1.0, -1.0)
+    glTexCoord2f(1.0, 0.0); glVertex2f( 1.0,  1.0)
+    glTexCoord2f(0.0, 0.0); glVertex2f(-1.0,  1.0)
+    glEnd()
+    glBindTexture(GL_TEXTURE_2D, 0)
+    glFinish()
+
+
+def run(background, frames):
+    draw(background, frames[0])  # warm up
+    start_mb, start = resident_mb(), time.perf_counter()
+    for index in range(num_frames):
+        draw(background, frames[index % len(frames)])
+    elapsed = time.perf_counter() - start
+    pixels = glReadPixels(0, 0, frame_size[0], frame_size[1], GL_BGR, GL_UNSIGNED_BYTE)
+    image = np.frombuffer(pixels, np.uint8).reshape(frame_size[1], frame_size[0], 3)[::-1]
+    return 1000 * elapsed / num_frames, resident_mb() - start_mb, image
+
+
+def main():
+    create_context(*frame_size)
+    print(f"Renderer: {glGetString(GL_RENDERER).decode()}, {glGetString(GL_VERSION).decode()}")
+    glViewport(0, 0, *frame_size)
+    glEnable(GL_TEXTURE_2D)
+    # Random colour frames, so a swapped channel or a flipped row shows up in the comparison.
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (frame_size[1], frame_size[0], 3), np.uint8) for _ in range(unique_frames)]
+
+    print(f"{'path':<28} {'ms/frame':>9} {'RSS growth MB':>14} {'matches frame':>14}")
+    for name, background in (('new texture per frame', LegacyBackground()),
+                             ('streaming texture', StreamingTexture()),
+                             ('streaming texture + PBO', StreamingTexture(pbo=True))):
+        ms, growth, image = run(background, frames)
+        expected = frames[(num_frames - 1) % len(frames)]
+        print(f"{name:<28} {ms:9.2f} {growth:14.1f} {str(np.array_equal(image, expected)):>14}")
+
+
+if __name__ == '__main__':
+    main()
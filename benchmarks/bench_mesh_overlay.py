@@ -0,0 +1,88 @@
+# Compare the per-face vertex search of the original STL overlay with the indexed mesh overlay.
+# Draws UV spheres of increasing size on a 720p frame and reports frames/sec against mesh size,
+# plus the shaded, depth-ordered MeshRenderer overlay with back-face culling.
+# Run from the repository root: python -m benchmarks.bench_mesh_overlay
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.mesh import indexed_mesh, project_faces, fill_faces, MeshRenderer
+
+# --- Configuration ---
+frame_size = (1280, 720)
+# Sphere resolutions to test, (rings, segments); the mesh has 2 * rings * segments triangles.
+sphere_resolutions = [(4, 8), (8, 16), (16, 32), (32, 64), (64, 128), (128, 256)]
+# The original overlay is quadratic in the mesh size, only run it up to this many faces.
+max_search_faces = 5000
+min_time = 0.5  # seconds measured per case
+
+camera_matrix = np.array([[1000.0, 0, 640.0], [0, 1000.0, 360.0], [0, 0, 1]])
+dist_coeffs = np.array([-0.15, 0.1, 0.0, 0.0, 0.0])
+rvec = np.array([0.3, -0.2, 0.1])
+tvec = np.array([0.0, 0.0, 8.0])
+
+
+def uv_sphere(rings, segments, radius=1.5):
+    """[Triangle soup of a UV sphere, shaped like the vectors of an STL mesh]"""
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments + 1)
+    grid = np.stack([np.sin(theta)[:, None] * np.cos(phi), np.sin(theta)[:, None] * np.sin(phi),
+                     np.cos(theta)[:, None] * np.ones_like(phi)], axis=-1) * radius
+    a, b = grid[:-1, :-1], grid[:-1, 1:]
+    c, d = grid[1:, :-1], grid[1:, 1:]
+    triangles = np.concatenate([np.stack([a, c, b], axis=2), np.stack([b, c, d], axis=2)])
+    return triangles.reshape(-1, 3, 3).astype(np.float32)
+
+
+def search_overlay(frame, triangles):
+    # The original 6_model3D_on_chessboard.py loop.
+    model_vertices = triangles.reshape(-1, 3)
+    image_points, _ = cv.projectPoints(model_vertices, rvec, tvec, camera_matrix, dist_coeffs)
+    image_points = np.int32(image_points).reshape(-1, 2)
+    for face in triangles:
+        projected_face = np.array([
+            image_points[np.where(np.all(model_vertices == face[0], axis=1))[0][0]],
+            image_points[np.where(np.all(model_vertices == face[1], axis=1))[0][0]],
+            image_points[np.where(np.all(model_vertices == face[2], axis=1))[0][0]]
+        ])
+        cv.fillPoly(frame, [projected_face], (0, 255, 0))
+
+
+def indexed_overlay(frame, vertices, faces):
+    fill_faces(frame, project_faces(vertices, faces, rvec, tvec, camera_matrix, dist_coeffs), (0, 255, 0))
+
+
+def shaded_overlay(frame, renderer):
+    renderer.draw(frame, rvec, tvec, camera_matrix, dist_coeffs)
+
+
+def frames_per_sec(fn, *args):
+    frame = np.zeros((frame_size[1], frame_size[0], 3), np.uint8)
+    fn(frame, *args)  # warm up
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn(frame, *args)
+        count += 1
+    return count / (time.perf_counter() - start), frame
+
+
+def main():
+    print(f"{'faces':>8} {'vertices':>9} {'search fps':>11} {'indexed fps':>12} {'speedup':>8} {'shaded fps':>11} {'drawn':>7}")
+    for rings, segments in sphere_resolutions:
+        triangles = uv_sphere(rings, segments)
+        vertices, faces = indexed_mesh(triangles)
+        indexed_fps, indexed_frame = frames_per_sec(indexed_overlay, vertices, faces)
+        renderer = MeshRenderer(vertices, faces)
+        shaded_fps, _ = frames_per_sec(shaded_overlay, renderer)
+        if len(triangles) <= max_search_faces:
+            search_fps, search_frame = frames_per_sec(search_overlay, triangles)
+            assert np.array_equal(search_frame, indexed_frame), "overlays differ"
+            search = f"{search_fps:11.1f} {indexed_fps:12.1f} {indexed_fps / search_fps:7.1f}x"
+        else:
+            search = f"{'-':>11} {indexed_fps:12.1f} {'-':>8}"
+        print(f"{len(faces):8d} {len(vertices):9d} {search} {shaded_fps:11.1f} {renderer.faces_drawn:7d}")
+
+
+if __name__ == '__main__':
+    main()
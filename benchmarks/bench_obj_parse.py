@@ -0,0 +1,100 @@
+# Compare the original line-by-line OBJ parsing with the bulk NumPy parser over Models/, and
+# with loading the compiled model (vertex data plus decoded textures) from its memory-mapped file.
+# Only the CPU side is timed, no OpenGL context is needed.
+# Run from the repository root: python -m benchmarks.bench_obj_parse
+import glob
+import tempfile
+import time
+
+import numpy as np
+
+from tools.objloader import parse_obj, load_model
+
+# --- Configuration ---
+model_files = sorted(glob.glob('Models/*/*.obj'))
+swapyz = True
+repeats = 5
+
+
+def legacy_parse(filename, swapyz=False):
+    # The parsing part of the original OBJ.__init__.
+    vertices, normals, texcoords, faces = [], [], [], []
+    material = None
+    for line in open(filename, "r"):
+        if line.startswith('#'): continue
+        values = line.split()
+        if not values: continue
+        if values[0] == 'v':
+            v = list(map(float, values[1:4]))
+            if swapyz:
+                v = v[0], v[2], v[1]
+            vertices.append(v)
+        elif values[0] == 'vn':
+            v = list(map(float, values[1:4]))
+            if swapyz:
+                v = v[0], v[2], v[1]
+            normals.append(v)
+        elif values[0] == 'vt':
+            texcoords.append(list(map(float, values[1:3])))
+        elif values[0] in ('usemtl', 'usemat'):
+            material = values[1]
+        elif values[0] == 'f':
+            face, face_texcoords, norms = [], [], []
+            for v in values[1:]:
+                w = v.split('/')
+                face.append(int(w[0]))
+                face_texcoords.append(int(w[1]) if len(w) >= 2 and len(w[1]) > 0 else 0)
+                norms.append(int(w[2]) if len(w) >= 3 and len(w[2]) > 0 else 0)
+            faces.append((face, norms, face_texcoords, material))
+    return vertices, normals, texcoords, faces
+
+
+def best_time(fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def check(legacy, data):
+    vertices, normals, texcoords, faces = legacy
+    assert np.allclose(data['vertices'], vertices) and np.allclose(data['normals'], np.reshape(normals, (-1, 3)))
+    assert np.allclose(data['texcoords'], np.reshape(texcoords, (-1, 2)))
+    # Fan-triangulate the legacy polygons and compare corner by corner.
+    triangles = []
+    for face, norms, face_texcoords, material in faces:
+        for k in range(1, len(face) - 1):
+            triangles.append([(face[i] - 1, face_texcoords[i] - 1, norms[i] - 1, material) for i in (0, k, k + 1)])
+    assert len(triangles) == len(data['faces'])
+    for triangle, indices, material in zip(triangles, data['faces'], data['face_materials']):
+        assert [list(corner[:3]) for corner in triangle] == indices.tolist()
+        assert triangle[0][3] == data['materials'][material]
+
+
+def main():
+    print(f"{'model':<45} {'lines':>7} {'triangles':>10} {'legacy ms':>10} {'numpy ms':>9} {'speedup':>8} "
+          f"{'compile ms':>11} {'compiled ms':>12}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for filename in model_files:
+            run_model(filename, cache_dir)
+
+
+def run_model(filename, cache_dir):
+    with open(filename) as file:
+        lines = sum(1 for _ in file)
+    legacy_time, legacy = best_time(legacy_parse, filename, swapyz)
+    numpy_time, data = best_time(parse_obj, filename, swapyz)
+    check(legacy, data)
+    # The first load parses and decodes the textures, the later ones map the compiled file.
+    start = time.perf_counter()
+    load_model(filename, swapyz, cache_dir)
+    compile_time = time.perf_counter() - start
+    compiled_time, _ = best_time(load_model, filename, swapyz, cache_dir)
+    print(f"{filename:<45} {lines:7d} {len(data['faces']):10d} {1000 * legacy_time:10.1f} "
+          f"{1000 * numpy_time:9.1f} {legacy_time / numpy_time:7.1f}x {1000 * compile_time:11.1f} {1000 * compiled_time:12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# Compare frames/sec of the OBJ rendering paths in an offscreen OpenGL context:
+# the original display list with one glBegin(GL_POLYGON) and one material change per face, the
+# display list with one glDrawArrays per material, and per-material draws from a vertex buffer.
+# Needs no window: the context comes from EGL, e.g. Mesa's llvmpipe software renderer.
+# Run from the repository root: python -m benchmarks.bench_obj_render
+import os
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+import ctypes
+import glob
+import tempfile
+import time
+
+import numpy as np
+from OpenGL import EGL
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from benchmarks.bench_obj_parse import legacy_parse
+from tools.objloader import MTL, OBJ
+
+# --- Configuration ---
+model_files = sorted(glob.glob('Models/*/*.obj'))
+swapyz = True
+viewport = (640, 480)
+min_time = 1.0  # seconds measured per path
+
+
+def create_context(width, height):
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    EGL.eglInitialize(display, None, None)
+    attributes = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8,
+                  EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                  EGL.EGL_NONE]
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    EGL.eglChooseConfig(display, (EGL.EGLint * len(attributes))(*attributes), ctypes.pointer(config), 1,
+                        ctypes.pointer(count))
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(
+        EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    EGL.eglMakeCurrent(display, surface, surface, context)
+
+
+def legacy_display_list(filename):
+    # The display list of the original OBJ class.
+    dir = filename[: filename.rfind('/') + 1]
+    vertices, normals, texcoords, faces = legacy_parse(filename, swapyz)
+    with open(filename) as file:
+        mtllib = next(line.split()[1] for line in file if line.startswith('mtllib'))
+    mtls = MTL(dir, mtllib)
+    gl_list = glGenLists(1)
+    glNewList(gl_list, GL_COMPILE)
+    glFrontFace(GL_CCW)
+    for face_vertices, face_normals, face_texcoords, material in faces:
+        mtl = mtls[material]
+        if 'texture_Kd' in mtl:
+            glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
+        else:
+            glColor3f(*mtl['Kd'])
+        glBegin(GL_POLYGON)
+        for i in range(len(face_vertices)):
+            if face_normals[i] > 0:
+                glNormal3fv(normals[face_normals[i] - 1])
+            if face_texcoords[i] > 0 and 'texture_Kd' in mtl:
+                glTexCoord2fv(texcoords[face_texcoords[i] - 1])
+            glVertex3fv(vertices[face_vertices[i] - 1])
+        glEnd()
+    glColor3f(1.0, 1.0, 1.0)
+    glEndList()
+    return gl_list
+
+
+def model_view(model):
+    # Fit the model into the view from its vertex data.
+    positions = model.vertex_data[:, 5:8]
+    center = (positions.min(axis=0) + positions.max(axis=0)) / 2
+    size = (positions.max(axis=0) - positions.min(axis=0)).max()
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glTranslatef(0, 0, -3)
+    glRotatef(30, 0, 1, 0)
+    glScalef(2 / size, 2 / size, 2 / size)
+    glTranslatef(*(-center))
+
+
+def frame(draw):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    draw()
+    glFinish()
+
+
+def frames_per_sec(draw):
+    frame(draw)  # warm up
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        frame(draw)
+        count += 1
+    fps = count / (time.perf_counter() - start)
+    pixels = glReadPixels(0, 0, viewport[0], viewport[1], GL_RGB, GL_UNSIGNED_BYTE)
+    return fps, np.frombuffer(pixels, np.uint8).reshape(viewport[1], viewport[0], 3)
+
+
+def main():
+    create_context(*viewport)
+    print(f"Renderer: {glGetString(GL_RENDERER).decode()}, {glGetString(GL_VERSION).decode()}")
+    glViewport(0, 0, *viewport)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_TEXTURE_2D)
+    glMatrixMode(GL_PROJECTION)
+    gluPerspective(45, viewport[0] / viewport[1], 0.1, 100.0)
+
+    print(f"{'model':<45} {'draws':>6} {'per-face list':>14} {'material list':>14} {'vbo':>8} {'max diff px':>12}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for filename in model_files:
+            legacy = legacy_display_list(filename)
+            listed = OBJ(filename, swapyz, cache_dir, use_vbo=False)
+            buffered = OBJ(filename, swapyz, cache_dir, use_vbo=True)
+            model_view(buffered)
+            legacy_fps, legacy_image = frames_per_sec(lambda: glCallList(legacy))
+            list_fps, list_image = frames_per_sec(listed.render)
+            vbo_fps, vbo_image = frames_per_sec(buffered.render)
+            # Polygons are split into triangles, which may move a few pixels along the diagonals.
+            diff = max((legacy_image != list_image).any(axis=2).sum(), (legacy_image != vbo_image).any(axis=2).sum())
+            print(f"{filename:<45} {len(buffered.draws):6d} {legacy_fps:14.1f} {list_fps:14.1f} {vbo_fps:8.1f} {diff:12d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Compare full-resolution and coarse-to-fine chessboard detection.
+# Run from the repository root: python -m benchmarks.bench_pyramid_detection
+import glob
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.chessboard import find_corners
+
+# --- Configuration ---
+chessboard_size = (9, 6)
+image_glob = 'captured_photos/*.jpg'
+# Resolutions the photos are resized to before timing, (width, height).
+resolutions = [(1280, 720), (3840, 2160)]
+# Longest side of the pyramid level used for coarse detection.
+pyramid_max_side = 1000
+# Repetitions per image; the best time is kept to reduce scheduler noise.
+repeats = 3
+
+
+def time_call(fn, *args, **kwargs):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    filenames = sorted(glob.glob(image_glob))
+    if not filenames:
+        print(f"Error: No images match '{image_glob}'.")
+        return
+    photos = [cv.cvtColor(cv.imread(f), cv.COLOR_BGR2GRAY) for f in filenames]
+
+    for width, height in resolutions:
+        frames = [cv.resize(p, (width, height), interpolation=cv.INTER_CUBIC) for p in photos]
+        # A frame without any board is the worst case for findChessboardCorners.
+        empty = cv.GaussianBlur(np.random.default_rng(0).integers(0, 256, (height, width), np.uint8), (0, 0), 3)
+
+        full_times, pyr_times, errors, found_full, found_pyr = [], [], [], 0, 0
+        for gray in frames:
+            t_full, full = time_call(find_corners, gray, chessboard_size)
+            t_pyr, pyr = time_call(find_corners, gray, chessboard_size, max_side=pyramid_max_side, fallback=False)
+            full_times.append(t_full)
+            pyr_times.append(t_pyr)
+            found_full += full is not None
+            found_pyr += pyr is not None
+            if full is not None and pyr is not None:
+                errors.append(np.linalg.norm((full - pyr).reshape(-1, 2), axis=1))
+
+        t_empty_full, _ = time_call(find_corners, empty, chessboard_size)
+        t_empty_pyr, _ = time_call(find_corners, empty, chessboard_size, max_side=pyramid_max_side, fallback=False)
+
+        errors = np.concatenate(errors) if errors else np.zeros(1)
+        print(f"\n--- {width}x{height}, {len(frames)} images ---")
+        print(f"Full resolution: {1000 * np.mean(full_times):8.2f} ms/frame, found {found_full}/{len(frames)}")
+        print(f"Pyramid (<= {pyramid_max_side}px): {1000 * np.mean(pyr_times):8.2f} ms/frame, found {found_pyr}/{len(frames)}"
+              f", speedup x{np.mean(full_times) / np.mean(pyr_times):.2f}")
+        print(f"No board in view: full {1000 * t_empty_full:.2f} ms, pyramid {1000 * t_empty_pyr:.2f} ms")
+        print(f"Corner difference vs full resolution: mean {errors.mean():.4f} px, max {errors.max():.4f} px")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Synthetic calibration benchmark with ground-truth intrinsics.
+# Renders the printable chessboard under known cameras and random poses, runs the headless
+# calibration pipeline end to end and compares the result with the ground truth.
+# Run from the repository root: python -m benchmarks.bench_synthetic_calibration
+import os
+import tempfile
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.chessboard import detect_corners_parallel
+from tools.synthetic import BoardRenderer
+
+# --- Configuration ---
+chessboard_size = (9, 6)
+square_size = 0.0265  # 26.5 mm
+views_per_camera = 40
+# Per-view blur and noise are drawn uniformly from these ranges.
+blur_sigma_range = (0.0, 1.5)
+noise_sigma_range = (1.0, 4.0)
+seed = 0
+num_workers = None
+
+# Ground-truth cameras: (name, image size, camera matrix, distortion coefficients).
+cameras = [
+    ("720p mild distortion", (1280, 720),
+     np.array([[960.0, 0, 645.0], [0, 965.0, 355.0], [0, 0, 1]]),
+     np.array([-0.15, 0.1, 0.0008, 0.0027, 0.0])),
+    ("720p strong barrel", (1280, 720),
+     np.array([[700.0, 0, 630.0], [0, 700.0, 370.0], [0, 0, 1]]),
+     np.array([-0.3, 0.12, 0.0, 0.0, -0.02])),
+    ("1080p long lens", (1920, 1080),
+     np.array([[2200.0, 0, 970.0], [0, 2205.0, 530.0], [0, 0, 1]]),
+     np.array([-0.05, 0.2, -0.001, 0.001, 0.0])),
+]
+
+
+def run_camera(name, image_size, camera_matrix, dist_coeffs, rng, work_dir):
+    # --- 1. Render the views ---
+    renderer = BoardRenderer(camera_matrix, dist_coeffs, image_size, chessboard_size, square_size)
+    filenames, truth = [], []
+    for i in range(views_per_camera):
+        rvec, tvec = renderer.random_pose(rng)
+        image = renderer.render(rvec, tvec, rng, rng.uniform(*blur_sigma_range), rng.uniform(*noise_sigma_range))
+        filename = os.path.join(work_dir, f"view_{i:03d}.png")
+        cv.imwrite(filename, image)
+        filenames.append(filename)
+        truth.append(renderer.project(rvec, tvec))
+
+    # --- 2. Detect the corners ---
+    results, images_per_sec = detect_corners_parallel(filenames, chessboard_size, num_workers)
+    image_points, corner_errors = [], []
+    for (corners, _), true_corners in zip(results, truth):
+        if corners is None:
+            continue
+        image_points.append(corners)
+        corners = corners.reshape(-1, 2)
+        # A 180 degree turn of the board gives the same pattern, so accept the reversed order too.
+        corner_errors.append(min(np.linalg.norm(corners - true_corners, axis=1).mean(),
+                                 np.linalg.norm(corners[::-1] - true_corners, axis=1).mean()))
+
+    # --- 3. Calibrate ---
+    start = time.perf_counter()
+    rms, estimated_matrix, estimated_dist, _, _ = cv.calibrateCamera(
+        [renderer.object_points] * len(image_points), image_points, image_size, None, None)
+    solve_time = time.perf_counter() - start
+
+    # --- 4. Report ---
+    params = [0, 1, 0, 1], [0, 1, 2, 2]
+    intrinsic_error = estimated_matrix[params] - camera_matrix[params]
+    dist_error = estimated_dist.ravel()[:5] - dist_coeffs.ravel()[:5]
+    print(f"\n--- {name} ({image_size[0]}x{image_size[1]}) ---")
+    print(f"Detection rate: {len(image_points)}/{len(filenames)}, {images_per_sec:.1f} images/sec")
+    print(f"Corner error vs ground truth: mean {np.mean(corner_errors):.4f}px")
+    print(f"Solve time: {1000 * solve_time:.1f} ms, RMS {rms:.4f}px")
+    print(f"Intrinsic error (fx, fy, cx, cy): {np.round(intrinsic_error, 3)} px, "
+          f"focal {100 * np.abs(intrinsic_error[:2] / camera_matrix[params][:2]).max():.3f}%")
+    print(f"Distortion error (k1, k2, p1, p2, k3): {np.round(dist_error, 4)}")
+
+
+def main():
+    rng = np.random.default_rng(seed)
+    for name, image_size, camera_matrix, dist_coeffs in cameras:
+        with tempfile.TemporaryDirectory() as work_dir:
+            run_camera(name, image_size, camera_matrix, dist_coeffs, rng, work_dir)
+
+
+if __name__ == '__main__':
+    main()
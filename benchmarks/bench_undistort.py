@@ -0,0 +1,52 @@
+# Compare per-frame cv.undistort plus ROI crop against the remap-based Undistorter.
+# Run from the repository root: python -m benchmarks.bench_undistort
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.undistort import Undistorter
+
+# --- Configuration ---
+sample_image = 'captured_photos/webcam_photo_2025-09-05_15-13-31.jpg'
+# Resolutions to test, (width, height). The calibration is scaled from its own resolution.
+resolutions = [(1280, 720), (3840, 2160)]
+calibration_size = (1280, 720)
+frames = 100
+
+
+def frames_per_sec(fn, frame):
+    fn(frame)  # warm up
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(frame)
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    with np.load('calibration_results.npz') as file:
+        camera_matrix = file['camera_matrix']
+        dist_coeffs = file['dist_coeffs']
+    sample = cv.imread(sample_image)
+
+    for width, height in resolutions:
+        scaled_matrix = camera_matrix.copy()
+        scaled_matrix[:2] *= width / calibration_size[0]
+        frame = cv.resize(sample, (width, height))
+
+        undistorter = Undistorter(scaled_matrix, dist_coeffs, (width, height), 1.0, maps_dir=None)
+        new_camera_matrix = undistorter.new_camera_matrix
+        x, y, w, h = undistorter.roi
+
+        def undistort_and_crop(frame):
+            return cv.undistort(frame, scaled_matrix, dist_coeffs, None, new_camera_matrix)[y:y+h, x:x+w]
+
+        difference = np.abs(undistort_and_crop(frame).astype(np.int16) - undistorter(frame)).max()
+        baseline = frames_per_sec(undistort_and_crop, frame)
+        engine = frames_per_sec(undistorter, frame)
+        print(f"{width}x{height}: cv.undistort {baseline:7.1f} fps, Undistorter {engine:7.1f} fps, "
+              f"speedup x{engine / baseline:.2f}, max pixel difference {difference}")
+
+
+if __name__ == '__main__':
+    main()
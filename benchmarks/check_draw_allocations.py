@@ -0,0 +1,142 @@
+# Check that the per-frame work of AR_render (9_AR_opencv_opengl.py), the detection of its
+# MarkerPoseWorker plus draw_objects, does not allocate per frame once warmed up.
+# Renders two ArUco markers moving over a 720p frame in an offscreen OpenGL context and uses tracemalloc
+# to measure, for every frame, the memory allocated above the level before the calls (NumPy and OpenCV
+# buffers included) and the growth over the whole run, next to the original per-frame code.
+# The worker is called directly on this thread instead of running on its own.
+# Exits with an error when the steady-state allocations are not near zero.
+# Run from the repository root: python -m benchmarks.check_draw_allocations
+import os
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+import gc
+import importlib.util
+import time
+import tracemalloc
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+from OpenGL.GL import *
+
+from benchmarks.bench_obj_render import create_context
+from tools.Visualize import draw_axis
+from tools.matrixTrans import extrinsic2ModelView, intrinsic2Project
+
+# --- Configuration ---
+frame_size = (1280, 720)
+id_to_model = {0: './Models/Barn/ban.obj', 1: './Models/Monster/Sinbad_4_000001.obj'}
+model_scale_dict = {0: 0.01, 1: 0.03}
+mark_size = 0.06
+warmup_frames = 30
+num_frames = 200
+# Largest allowed steady-state allocation per frame and growth over the run, in bytes.
+max_frame_bytes = 32 << 10
+max_growth_bytes = 16 << 10
+
+spec = importlib.util.spec_from_file_location('ar_opengl', '9_AR_opencv_opengl.py')
+ar_opengl = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ar_opengl)
+
+
+class OffscreenAR(ar_opengl.AR_render):
+    # AR_render drawing into an EGL pbuffer instead of a GLUT window.
+    def initOpengl(self, width, height, *args, **kwargs):
+        create_context(width, height)
+        glViewport(0, 0, width, height)
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_TEXTURE_2D)
+
+
+def legacy_draw_objects(self, image, mark_size=0.01):
+    # The original per-frame detection and matrix setup of draw_objects.
+    aruco_dict = aruco.getPredefinedDictionary(aruco.DICT_6X6_250)
+    parameters = aruco.DetectorParameters()
+    parameters.adaptiveThreshConstant = 7.0
+    height, width, channels = image.shape
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    corners, ids, _ = aruco.detectMarkers(gray, aruco_dict, parameters=parameters)
+    projectMatrix = intrinsic2Project(self.cam_matrix, width, height, 0.01, 100.0)
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glMultMatrixf(projectMatrix)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    if ids is not None and corners is not None:
+        rvecs, tvecs, _ = aruco.estimatePoseSingleMarkers(corners, mark_size, self.cam_matrix, self.dist_coefs)
+        for i, marker_id in enumerate(ids.flatten()):
+            model = self.models.get(marker_id)
+            if model is not None:
+                draw_axis(image, rvecs[i], tvecs[i], self.cam_matrix, self.dist_coefs)
+                glLoadMatrixf(extrinsic2ModelView(rvecs[i], tvecs[i]))
+                scale = self.model_scale_dict.get(marker_id, 0.01)
+                glScaled(scale, scale, scale)
+                model.render()
+
+
+def current_frame(self, image, mark_size):
+    self.tracker.process(image, time.perf_counter())
+    self.draw_objects(image, time.perf_counter())
+
+
+def marker_frames(count):
+    # Frames with the two markers sliding sideways, so their poses change every frame.
+    dictionary = aruco.getPredefinedDictionary(aruco.DICT_6X6_250)
+    frames = []
+    for index in range(count):
+        frame = np.full((frame_size[1], frame_size[0], 3), 200, np.uint8)
+        for marker_id, x in ((0, 250), (1, 800)):
+            marker = cv2.cvtColor(aruco.generateImageMarker(dictionary, marker_id, 200), cv2.COLOR_GRAY2BGR)
+            border = cv2.copyMakeBorder(marker, 20, 20, 20, 20, cv2.BORDER_CONSTANT, value=(255, 255, 255))
+            left = x + 2 * (index % 20)
+            frame[240:240 + border.shape[0], left:left + border.shape[1]] = border
+        frames.append(frame)
+    return frames
+
+
+def measure(draw, ar, frames):
+    for index in range(warmup_frames):
+        draw(ar, frames[index % len(frames)].copy(), mark_size)
+    images = [frames[index % len(frames)].copy() for index in range(num_frames)]
+    # PyOpenGL's wrappers leave reference cycles behind, count memory after collecting them.
+    gc.collect()
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    frame_bytes, start = [], time.perf_counter()
+    for image in images:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        draw(ar, image, mark_size)
+        glFinish()
+        frame_bytes.append(tracemalloc.get_traced_memory()[1] - before)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+    return 1000 * elapsed / num_frames, int(np.median(frame_bytes)), growth
+
+
+def main():
+    camera_matrix = np.array([[0.8 * frame_size[0], 0, frame_size[0] / 2], [0, 0.8 * frame_size[0], frame_size[1] / 2],
+                              [0, 0, 1]])
+    ar = OffscreenAR(camera_matrix, np.zeros(5), id_to_model, model_scale_dict, frame_source='synthetic', realtime=False,
+                     mark_size=mark_size)
+    ar.tracker.stop()
+    print(f"Renderer: {glGetString(GL_RENDERER).decode()}, {glGetString(GL_VERSION).decode()}")
+    frames = marker_frames(20)
+    # Load the models before measuring.
+    while any(ar.models.get(marker_id) is None for marker_id in id_to_model):
+        time.sleep(0.01)
+
+    print(f"{'frame':<12} {'ms/frame':>9} {'KB/frame':>9} {'growth KB':>10}")
+    for name, draw in (('original', legacy_draw_objects), ('current', current_frame)):
+        ms, frame_bytes, growth = measure(draw, ar, frames)
+        print(f"{name:<12} {ms:9.2f} {frame_bytes / 1024:9.1f} {growth / 1024:10.1f}")
+    assert frame_bytes <= max_frame_bytes, f"a frame allocates {frame_bytes} bytes per frame"
+    assert growth <= max_growth_bytes, f"the frames grew memory by {growth} bytes"
+    ar.models.release()
+    ar.webcam.release()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.chessboard import board_object_points
+
+# A warm-started update only has to correct a good guess, so a few iterations are enough.
+UPDATE_CRITERIA = (cv.TERM_CRITERIA_COUNT + cv.TERM_CRITERIA_EPS, 5, 1e-6)
+# Same as the calibrateCamera default, used for full refinements.
+REFINE_CRITERIA = (cv.TERM_CRITERIA_COUNT + cv.TERM_CRITERIA_EPS, 30, np.finfo(float).eps)
+
+
+class IncrementalCalibrator:
+    """[Camera calibration that absorbs chessboard views one at a time]
+
+    Every solve after the first is warm-started from the previous camera_matrix/dist_coeffs with
+    CALIB_USE_INTRINSIC_GUESS. Most new views trigger a cheap update over the latest `window`
+    views; every `refine_every` views a full refinement over all views is run instead.
+    """
+    def __init__(self, chessboard_size, square_size=1.0, image_size=None, min_views=5, window=20,
+                 refine_every=10, flags=0):
+        """[Initialize]
+
+        Arguments:
+            chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+        Keyword Arguments:
+            square_size {float} -- [size of one square in world units] (default: {1.0})
+            image_size {[tuple]} -- [(width, height) of the views, can also come with add_view] (default: {None})
+            min_views {int} -- [views needed before the first solve] (default: {5})
+            window {int} -- [number of latest views used by a cheap update] (default: {20})
+            refine_every {int} -- [run a full refinement every this many views] (default: {10})
+            flags {int} -- [extra calibrateCamera flags] (default: {0})
+        """
+        self.object_points = board_object_points(chessboard_size, square_size)
+        self.image_size = tuple(image_size) if image_size is not None else None
+        self.min_views = min_views
+        self.window = window
+        self.refine_every = refine_every
+        self.flags = flags
+        self.image_points = []
+        self.camera_matrix = None
+        self.dist_coeffs = None
+        self.rms = None
+        self.solve_time = None
+
+    @property
+    def calibrated(self):
+        return self.camera_matrix is not None
+
+    def add_view(self, corners, image_size=None):
+        """[Add the refined corners of one view and update the calibration]
+
+        Arguments:
+            corners {[np.array]} -- [(N, 1, 2) corners from find_corners]
+
+        Keyword Arguments:
+            image_size {[tuple]} -- [(width, height) of the view] (default: {None})
+
+        Returns:
+            [bool] -- [True if the calibration was (re)computed]
+        """
+        if image_size is not None:
+            self.image_size = tuple(image_size)
+        self.image_points.append(np.asarray(corners, np.float32).reshape(-1, 1, 2))
+        count = len(self.image_points)
+        if count < self.min_views:
+            return False
+        if not self.calibrated or count % self.refine_every == 0:
+            self.refine()
+        else:
+            self.update()
+        return True
+
+    def update(self):
+        """[Cheap warm-started solve over the latest `window` views; rms covers only those views]"""
+        self._solve(self.image_points[-self.window:], UPDATE_CRITERIA)
+
+    def refine(self):
+        """[Full solve over every view, warm-started when a previous estimate exists]"""
+        self._solve(self.image_points, REFINE_CRITERIA)
+
+    def _solve(self, image_points, criteria):
+        flags = self.flags
+        camera_matrix, dist_coeffs = None, None
+        if self.calibrated:
+            flags |= cv.CALIB_USE_INTRINSIC_GUESS
+            camera_matrix, dist_coeffs = self.camera_matrix.copy(), self.dist_coeffs.copy()
+        start = time.perf_counter()
+        rms, camera_matrix, dist_coeffs, _, _ = cv.calibrateCamera(
+            [self.object_points] * len(image_points), image_points, self.image_size,
+            camera_matrix, dist_coeffs, flags=flags, criteria=criteria)
+        self.solve_time = time.perf_counter() - start
+        self.rms, self.camera_matrix, self.dist_coeffs = rms, camera_matrix, dist_coeffs
+
+
+def view_poses(object_points, image_points, camera_matrix, dist_coeffs=None):
+    """[Board pose of every view from solvePnP]
+
+    Arguments:
+        object_points {[np.array]} -- [(N, 3) board corners]
+        image_points {[list]} -- [(N, 1, 2) corners of each view]
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+
+    Keyword Arguments:
+        dist_coeffs {[np.array]} -- [distortion coefficients] (default: {None})
+
+    Returns:
+        [tuple] -- [(V, 3) rotation vectors, (V, 3) translation vectors]
+    """
+    rvecs = np.zeros((len(image_points), 3))
+    tvecs = np.zeros((len(image_points), 3))
+    for i, corners in enumerate(image_points):
+        _, rvec, tvec = cv.solvePnP(object_points, corners, camera_matrix, dist_coeffs)
+        rvecs[i], tvecs[i] = rvec.ravel(), tvec.ravel()
+    return rvecs, tvecs
+
+
+def select_views(object_points, image_points, image_size, max_views, grid=(8, 6), pose_weight=1.0):
+    """[Pick a bounded subset of views that covers the image plane and varies the board pose]
+
+    Views are chosen greedily: each step takes the view that adds the most uncovered grid cells
+    plus `pose_weight` times its pose distance to the views already chosen. Poses come from a
+    per-view solvePnP against an initCameraMatrix2D estimate, described by the board normal,
+    the viewing direction and the log distance.
+
+    Arguments:
+        object_points {[np.array]} -- [(N, 3) board corners]
+        image_points {[list]} -- [(N, 1, 2) corners of each view]
+        image_size {[tuple]} -- [(width, height) of the views]
+        max_views {int} -- [number of views to keep]
+
+    Keyword Arguments:
+        grid {tuple} -- [coverage grid (cols, rows) over the image] (default: {(8, 6)})
+        pose_weight {float} -- [weight of pose diversity against coverage] (default: {1.0})
+
+    Returns:
+        [list] -- [sorted indices of the selected views]
+    """
+    count = len(image_points)
+    if count <= max_views:
+        return list(range(count))
+
+    # Image-plane coverage: the grid cells hit by each view's corners.
+    points = np.stack([np.asarray(c, np.float32).reshape(-1, 2) for c in image_points])
+    cells = np.floor(points * (np.array(grid) / np.array(image_size))).astype(int)
+    cells = np.clip(cells, 0, np.array(grid) - 1)
+    coverage = np.zeros((count, grid[0] * grid[1]), bool)
+    coverage[np.arange(count)[:, None], cells[..., 1] * grid[0] + cells[..., 0]] = True
+
+    # Pose descriptors from a rough, distortion-free intrinsic estimate.
+    camera_matrix = cv.initCameraMatrix2D([object_points] * count, list(points.reshape(count, -1, 1, 2)), image_size)
+    rvecs, tvecs = view_poses(object_points, points.reshape(count, -1, 1, 2), camera_matrix)
+    normals = np.stack([cv.Rodrigues(r)[0][:, 2] for r in rvecs])
+    distance = np.linalg.norm(tvecs, axis=1, keepdims=True)
+    features = np.hstack((normals, tvecs / distance, np.log(distance)))
+
+    first = int(np.argmax(coverage.sum(axis=1)))
+    selected = [first]
+    covered = coverage[first].copy()
+    pose_distance = np.linalg.norm(features - features[first], axis=1)
+    available = np.ones(count, bool)
+    available[first] = False
+    while len(selected) < max_views:
+        gain = (coverage & ~covered).sum(axis=1)
+        score = gain / max(gain.max(), 1) + pose_weight * pose_distance / max(pose_distance.max(), 1e-12)
+        score[~available] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        available[best] = False
+        covered |= coverage[best]
+        pose_distance = np.minimum(pose_distance, np.linalg.norm(features - features[best], axis=1))
+    return sorted(selected)
+
+
+def rotation_matrices(rvecs):
+    """[Rodrigues formula for many rotation vectors at once]
+
+    Arguments:
+        rvecs {[np.array]} -- [(V, 3) rotation vectors]
+
+    Returns:
+        [np.array] -- [(V, 3, 3) rotation matrices]
+    """
+    rvecs = np.asarray(rvecs, np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    axis = rvecs / np.where(theta > 1e-12, theta, 1.0)[:, None]
+    skew = np.zeros((len(rvecs), 3, 3))
+    skew[:, 0, 1], skew[:, 0, 2], skew[:, 1, 2] = -axis[:, 2], axis[:, 1], -axis[:, 0]
+    skew -= skew.transpose(0, 2, 1)
+    sin, cos = np.sin(theta)[:, None, None], np.cos(theta)[:, None, None]
+    return np.eye(3) + sin * skew + (1 - cos) * skew @ skew
+
+
+def project_views(object_points, rvecs, tvecs, camera_matrix, dist_coeffs):
+    """[Project the board into every view at once, matching cv.projectPoints]
+
+    Supports the standard (k1, k2, p1, p2[, k3[, k4, k5, k6]]) distortion models.
+
+    Arguments:
+        object_points {[np.array]} -- [(N, 3) board corners]
+        rvecs {[np.array]} -- [(V, 3) rotation vectors]
+        tvecs {[np.array]} -- [(V, 3) translation vectors]
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+        dist_coeffs {[np.array]} -- [distortion coefficients]
+
+    Returns:
+        [np.array] -- [(V, N, 2) projected corners]
+    """
+    dist = np.zeros(8)
+    if dist_coeffs is not None:
+        coeffs = np.asarray(dist_coeffs, np.float64).ravel()
+        if len(coeffs) > 8:
+            raise ValueError("thin prism and tilted distortion models are not supported")
+        dist[:len(coeffs)] = coeffs
+    k1, k2, p1, p2, k3, k4, k5, k6 = dist
+
+    points = np.asarray(object_points, np.float64).reshape(-1, 3)
+    cam = points @ rotation_matrices(rvecs).transpose(0, 2, 1) + np.asarray(tvecs, np.float64).reshape(-1, 1, 3)
+    x, y = cam[..., 0] / cam[..., 2], cam[..., 1] / cam[..., 2]
+    r2 = x * x + y * y
+    radial = (1 + r2 * (k1 + r2 * (k2 + r2 * k3))) / (1 + r2 * (k4 + r2 * (k5 + r2 * k6)))
+    xd = x * radial + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+    yd = y * radial + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+    fx, fy, cx, cy = camera_matrix[0, 0], camera_matrix[1, 1], camera_matrix[0, 2], camera_matrix[1, 2]
+    return np.stack((fx * xd + camera_matrix[0, 1] * yd + cx, fy * yd + cy), axis=-1)
+
+
+def reprojection_errors(object_points, image_points, rvecs, tvecs, camera_matrix, dist_coeffs):
+    """[Per-corner and per-view reprojection errors over all views at once]
+
+    Arguments:
+        object_points {[np.array]} -- [(N, 3) board corners]
+        image_points {[list]} -- [(N, 1, 2) detected corners of each view]
+        rvecs {[list]} -- [rotation vector of each view]
+        tvecs {[list]} -- [translation vector of each view]
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+        dist_coeffs {[np.array]} -- [distortion coefficients]
+
+    Returns:
+        [tuple] -- [(V, N) corner errors in pixels, (V,) per-view RMS errors]
+    """
+    detected = np.stack([np.asarray(c, np.float64).reshape(-1, 2) for c in image_points])
+    projected = project_views(object_points, np.reshape(rvecs, (-1, 3)), np.reshape(tvecs, (-1, 3)),
+                              camera_matrix, dist_coeffs)
+    corner_errors = np.linalg.norm(projected - detected, axis=2)
+    return corner_errors, np.sqrt(np.mean(corner_errors ** 2, axis=1))
+
+
+def reprojection_rms(object_points, image_points, camera_matrix, dist_coeffs):
+    """[RMS reprojection error of fixed intrinsics over views they were not necessarily solved from]
+
+    Each view's pose is re-estimated with solvePnP before projecting, so the result can be
+    compared with the RMS that calibrateCamera reports.
+    """
+    rvecs, tvecs = view_poses(object_points, image_points, camera_matrix, dist_coeffs)
+    corner_errors, _ = reprojection_errors(object_points, image_points, rvecs, tvecs, camera_matrix, dist_coeffs)
+    return np.sqrt(np.mean(corner_errors ** 2))
+
+
+def reject_outlier_views(object_points, image_points, image_size, calibration, max_view_error,
+                         drop_fraction=0.1, min_views=10, flags=0):
+    """[Drop the worst views and re-solve until every view is below `max_view_error`]
+
+    Each round removes at most `drop_fraction` of the views, and only views above the threshold,
+    then re-solves warm-started from the previous intrinsics with CALIB_USE_INTRINSIC_GUESS.
+
+    Arguments:
+        object_points {[np.array]} -- [(N, 3) board corners]
+        image_points {[list]} -- [(N, 1, 2) corners of each view]
+        image_size {[tuple]} -- [(width, height) of the views]
+        calibration {[tuple]} -- [(rms, camera_matrix, dist_coeffs, rvecs, tvecs) from calibrateCamera]
+        max_view_error {float} -- [per-view RMS threshold in pixels]
+
+    Keyword Arguments:
+        drop_fraction {float} -- [largest fraction of views dropped per round] (default: {0.1})
+        min_views {int} -- [never go below this many views] (default: {10})
+        flags {int} -- [extra calibrateCamera flags] (default: {0})
+
+    Returns:
+        [tuple] -- [kept view indices, final calibrateCamera result, per-view RMS of the kept views]
+    """
+    kept = list(range(len(image_points)))
+    rms, camera_matrix, dist_coeffs, rvecs, tvecs = calibration
+    while True:
+        _, view_errors = reprojection_errors(object_points, [image_points[i] for i in kept], rvecs, tvecs,
+                                             camera_matrix, dist_coeffs)
+        worst = np.argsort(view_errors)[::-1]
+        budget = min(max(1, int(drop_fraction * len(kept))), len(kept) - min_views)
+        drop = {kept[w] for w in worst[:max(budget, 0)] if view_errors[w] > max_view_error}
+        if not drop:
+            break
+        kept = [v for v in kept if v not in drop]
+        rms, camera_matrix, dist_coeffs, rvecs, tvecs = cv.calibrateCamera(
+            [object_points] * len(kept), [image_points[i] for i in kept], image_size,
+            camera_matrix.copy(), dist_coeffs.copy(), flags=flags | cv.CALIB_USE_INTRINSIC_GUESS)
+    return kept, (rms, camera_matrix, dist_coeffs, rvecs, tvecs), view_errors
@@ -0,0 +1,304 @@
+import os
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from tools.synthetic import BoardRenderer
+
+
+class ThreadedCapture:
+    """[cv.VideoCapture that reads on a background thread into a small ring of reused buffers]
+
+    read() always returns the newest frame and never builds a backlog: frames the consumer was
+    too slow to pick up are counted as dropped. The frame returned by read() stays untouched until
+    the next read(), so it may be drawn on in place but must be copied to be kept longer.
+    """
+    def __init__(self, source=0, width=None, height=None, buffers=3):
+        """[Open the source and start the capture thread]
+
+        Keyword Arguments:
+            source {int or string} -- [camera index or video path for cv.VideoCapture] (default: {0})
+            width {int} -- [requested frame width] (default: {None})
+            height {int} -- [requested frame height] (default: {None})
+            buffers {int} -- [size of the frame ring, at least 3] (default: {3})
+        """
+        self.cap = cv.VideoCapture(source)
+        if width is not None:
+            self.cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+        if height is not None:
+            self.cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+        self._buffers = [None] * max(buffers, 3)
+        self._condition = threading.Condition()
+        self._latest = None      # slot of the newest captured frame
+        self._latest_time = None
+        self._reading = None     # slot currently handed out to the consumer
+        self._sequence = 0       # number of frames captured so far
+        self._delivered = 0      # sequence number of the last frame handed out
+        self._running = self.cap.isOpened()
+        self._ended = False
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.timestamp = None    # capture time (time.perf_counter) of the frame last returned
+        self.latency = None      # age of that frame when it was returned, in seconds
+        self._latency_total = 0.0
+        self._frames_read = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        if self._running:
+            self._thread.start()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def _run(self):
+        slot = 0
+        while self._running:
+            # Never write into the newest frame or into the one the consumer holds.
+            with self._condition:
+                while slot in (self._latest, self._reading):
+                    slot = (slot + 1) % len(self._buffers)
+            ret, frame = self.cap.read(self._buffers[slot])
+            stamp = time.perf_counter()
+            with self._condition:
+                if not ret:
+                    self._ended = True
+                    self._condition.notify_all()
+                    return
+                self._buffers[slot] = frame
+                if self._sequence > self._delivered:
+                    self.frames_dropped += 1
+                self._latest, self._latest_time = slot, stamp
+                self._sequence += 1
+                self.frames_captured += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=2.0):
+        """[Wait for a frame newer than the last one returned]
+
+        Keyword Arguments:
+            timeout {float} -- [seconds to wait before giving up] (default: {2.0})
+
+        Returns:
+            [tuple] -- [(ret, frame) like cv.VideoCapture.read]
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > self._delivered or self._ended, timeout):
+                return False, None
+            if self._sequence == self._delivered:
+                return False, None
+            self._reading = self._latest
+            self._delivered = self._sequence
+            self.timestamp = self._latest_time
+            frame = self._buffers[self._reading]
+        self.latency = time.perf_counter() - self.timestamp
+        self._latency_total += self.latency
+        self._frames_read += 1
+        return True, frame
+
+    @property
+    def mean_latency(self):
+        return self._latency_total / self._frames_read if self._frames_read else 0.0
+
+    def stats(self):
+        """[One-line summary of the capture counters]"""
+        return (f"{self.frames_captured} frames captured, {self.frames_dropped} dropped, "
+                f"mean latency {1000 * self.mean_latency:.1f} ms")
+
+    def release(self):
+        self._running = False
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.cap.release()
+
+
+class FrameSource:
+    """[Base of the replayable frame sources, paced like a camera or as fast as possible]
+
+    Subclasses implement _read() and _skip(). With `realtime` set, frames are delivered at
+    `fps` and frames whose time has already passed are skipped like a live camera would; without
+    it every frame is delivered in order, as fast as the consumer asks for them.
+    """
+    def __init__(self, fps=30.0, realtime=True):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.frame_size = (0, 0)
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.timestamp = None
+        self._index = 0
+        self._start = None
+        self._first_read = None
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _skip(self):
+        return self._read() is not None
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv.CAP_PROP_FRAME_WIDTH:
+            return self.frame_size[0]
+        if prop == cv.CAP_PROP_FRAME_HEIGHT:
+            return self.frame_size[1]
+        if prop == cv.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def read(self):
+        """[Next frame, like cv.VideoCapture.read]"""
+        if self.realtime and self._start is not None:
+            behind = int((time.perf_counter() - self._start) * self.fps) - self._index
+            for _ in range(behind):
+                if not self._skip():
+                    return False, None
+                self._index += 1
+                self.frames_dropped += 1
+        frame = self._read()
+        if frame is None:
+            return False, None
+        now = time.perf_counter()
+        if self.realtime:
+            if self._start is None:
+                self._start = now - self._index / self.fps
+            delay = self._start + self._index / self.fps - now
+            if delay > 0:
+                time.sleep(delay)
+                now = time.perf_counter()
+        if self._first_read is None:
+            self._first_read = now
+        self._index += 1
+        self.frames_captured += 1
+        self.timestamp = now
+        return True, frame
+
+    def stats(self):
+        """[One-line summary of the replay counters]"""
+        elapsed = (self.timestamp - self._first_read) if self.frames_captured > 1 else 0.0
+        rate = (self.frames_captured - 1) / elapsed if elapsed > 0 else 0.0
+        return f"{self.frames_captured} frames delivered, {self.frames_dropped} skipped, {rate:.1f} frames/sec"
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(FrameSource):
+    """[Replay a video file at its recorded frame rate or as fast as possible]"""
+    def __init__(self, path, realtime=True):
+        self.cap = cv.VideoCapture(path)
+        super().__init__(self.cap.get(cv.CAP_PROP_FPS), realtime)
+        self.frame_size = (int(self.cap.get(cv.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv.CAP_PROP_FRAME_HEIGHT)))
+        self._frame = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _read(self):
+        ret, frame = self.cap.read(self._frame)
+        if not ret:
+            return None
+        self._frame = frame
+        return frame
+
+    def _skip(self):
+        return self.cap.grab()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageFolderSource(FrameSource):
+    """[Replay the images of a directory, such as captured_photos/, in name order]"""
+    def __init__(self, folder, fps=30.0, realtime=True, extensions=('.jpg', '.jpeg', '.png', '.bmp')):
+        super().__init__(fps, realtime)
+        self.files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(extensions))
+        if self.files:
+            first = cv.imread(self.files[0])
+            self.frame_size = (first.shape[1], first.shape[0]) if first is not None else (0, 0)
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def _read(self):
+        while self._index < len(self.files):
+            frame = cv.imread(self.files[self._index])
+            if frame is not None:
+                return frame
+            self._index += 1
+        return None
+
+    def _skip(self):
+        return self._index < len(self.files)
+
+
+class SyntheticSource(FrameSource):
+    """[Deterministic rendered chessboard footage, see tools.synthetic.BoardRenderer]
+
+    The board moves smoothly between seeded random key poses. The `unique_frames` distinct frames
+    are rendered once and then replayed back and forth, so rendering does not cap throughput.
+    """
+    def __init__(self, width=1280, height=720, num_frames=300, unique_frames=60, key_every=15, seed=0,
+                 camera_matrix=None, dist_coeffs=None, fps=30.0, realtime=True):
+        super().__init__(fps, realtime)
+        width, height = width or 1280, height or 720
+        if camera_matrix is None:
+            camera_matrix = np.array([[0.8 * width, 0, width / 2], [0, 0.8 * width, height / 2], [0, 0, 1]])
+        if dist_coeffs is None:
+            dist_coeffs = np.zeros(5)
+        self.frame_size = (width, height)
+        self.num_frames = num_frames
+        self.renderer = BoardRenderer(camera_matrix, dist_coeffs, (width, height))
+        rng = np.random.default_rng(seed)
+        keys = [self.renderer.random_pose(rng) for _ in range(unique_frames // key_every + 2)]
+        self.poses = []
+        for i in range(unique_frames):
+            (r0, t0), (r1, t1) = keys[i // key_every], keys[i // key_every + 1]
+            s = (i % key_every) / key_every
+            self.poses.append(((1 - s) * r0 + s * r1, (1 - s) * t0 + s * t1))
+        self._frames = [None] * unique_frames
+        self._output = np.empty((height, width, 3), np.uint8)
+
+    def _read(self):
+        if self._index >= self.num_frames:
+            return None
+        period = 2 * len(self._frames) - 2
+        i = self._index % period if period > 0 else 0
+        i = i if i < len(self._frames) else period - i
+        if self._frames[i] is None:
+            self._frames[i] = cv.cvtColor(self.renderer.render(*self.poses[i]), cv.COLOR_GRAY2BGR)
+        # Hand out a copy in a reused buffer, consumers draw on their frames.
+        np.copyto(self._output, self._frames[i])
+        return self._output
+
+    def _skip(self):
+        return self._index < self.num_frames
+
+
+def open_frame_source(source=0, width=None, height=None, realtime=True):
+    """[Open a live camera, a video file, an image directory or the synthetic generator]
+
+    Keyword Arguments:
+        source {int or string} -- [camera index, video path, image directory or 'synthetic'] (default: {0})
+        width {int} -- [requested frame width, used by the camera and the synthetic source] (default: {None})
+        height {int} -- [requested frame height, used by the camera and the synthetic source] (default: {None})
+        realtime {bool} -- [replay recorded sources at their frame rate instead of as fast as possible] (default: {True})
+
+    Returns:
+        [object] -- [source with isOpened(), read(), get(), stats() and release()]
+    """
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return ThreadedCapture(int(source), width, height)
+    if source == 'synthetic':
+        return SyntheticSource(width, height, realtime=realtime)
+    if os.path.isdir(source):
+        return ImageFolderSource(source, realtime=realtime)
+    return VideoFileSource(source, realtime=realtime)
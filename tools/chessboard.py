@@ -0,0 +1,456 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import cv2 as cv
+import numpy as np
+
+# Detection settings shared by every script that looks for the calibration board.
+# The `cv.CALIB_CB_ADAPTIVE_THRESH` flag improves corner detection in varying lighting conditions.
+FIND_FLAGS = cv.CALIB_CB_ADAPTIVE_THRESH + cv.CALIB_CB_FAST_CHECK + cv.CALIB_CB_NORMALIZE_IMAGE
+SUBPIX_WINDOW = (11, 11)
+SUBPIX_CRITERIA = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+
+def board_object_points(chessboard_size, square_size=1.0):
+    """[3D coordinates of the inner corners, with the board on the Z=0 plane]
+
+    Arguments:
+        chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+    Keyword Arguments:
+        square_size {float} -- [size of one square in world units] (default: {1.0})
+
+    Returns:
+        [np.array] -- [(N, 3) float32 array of corner positions]
+    """
+    objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2) * square_size
+    return objp
+
+
+def chessboard_pattern(chessboard_size, square_pixels=100):
+    """[Draw the printable chessboard, the top-left square being white]
+
+    Arguments:
+        chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+    Keyword Arguments:
+        square_pixels {int} -- [size of each square in pixels] (default: {100})
+
+    Returns:
+        [np.array] -- [BGR image of (rows+1) x (cols+1) squares]
+    """
+    # The total number of squares is (rows+1) x (cols+1)
+    grid_rows = chessboard_size[1] + 1
+    grid_cols = chessboard_size[0] + 1
+
+    # Create a blank white image
+    chessboard_image = np.full((grid_rows * square_pixels, grid_cols * square_pixels, 3), 255, dtype=np.uint8)
+
+    # Loop through each cell to draw the alternating black squares
+    for row in range(grid_rows):
+        for col in range(grid_cols):
+            # A cell is black if the sum of its row and column index is odd
+            if (row + col) % 2 == 1:
+                start_x = col * square_pixels
+                start_y = row * square_pixels
+                # Draw a filled black rectangle for the square
+                cv.rectangle(
+                    chessboard_image,
+                    (start_x, start_y),
+                    (start_x + square_pixels, start_y + square_pixels),
+                    (0, 0, 0),  # Black color in BGR format
+                    -1 # -1 fills the rectangle
+                )
+    return chessboard_image
+
+
+def find_corners(gray, chessboard_size, flags=FIND_FLAGS, win_size=SUBPIX_WINDOW, criteria=SUBPIX_CRITERIA,
+                 max_side=None, fallback=True):
+    """[Find the chessboard and refine its corners to sub-pixel accuracy]
+
+    With `max_side` set, the board is searched for on the first pyramid level whose longest side
+    fits within `max_side`; the coarse corners are then scaled up and refined at full resolution.
+
+    Arguments:
+        gray {[np.array]} -- [grayscale image]
+        chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+    Keyword Arguments:
+        max_side {int} -- [longest side of the detection level, None detects at full resolution] (default: {None})
+        fallback {bool} -- [retry at full resolution when the coarse level finds no board] (default: {True})
+
+    Returns:
+        [np.array] -- [refined (N, 1, 2) corners, or None if no full board was found]
+    """
+    small, level = gray, 0
+    if max_side is not None:
+        while max(small.shape[:2]) > max_side:
+            small = cv.pyrDown(small)
+            level += 1
+    ret, corners = cv.findChessboardCorners(small, chessboard_size, None, flags)
+    if not ret:
+        if level > 0 and fallback:
+            return find_corners(gray, chessboard_size, flags, win_size, criteria)
+        return None
+    # pyrDown keeps pixel centres aligned, so level coordinates map back by a plain power of two.
+    corners *= 2 ** level
+    return cv.cornerSubPix(gray, corners, win_size, (-1, -1), criteria)
+
+
+def detect_image_corners(filename, chessboard_size, max_side=None):
+    """[Read one image file and detect its chessboard corners]
+
+    Arguments:
+        filename {[string]} -- [path of the image]
+        chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+    Keyword Arguments:
+        max_side {int} -- [pyramid detection size, see find_corners] (default: {None})
+
+    Returns:
+        [tuple] -- [(corners, image_size); corners is None when no board was found,
+                    image_size is None when the image could not be read]
+    """
+    img = cv.imread(filename)
+    if img is None:
+        return None, None
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+    return find_corners(gray, chessboard_size, max_side=max_side), gray.shape[::-1]
+
+
+def _init_worker():
+    # Each worker already owns a core, so keep OpenCV from spawning its own thread pool.
+    cv.setNumThreads(1)
+
+
+def detect_corners_parallel(filenames, chessboard_size, workers=None, chunksize=4, cache=None, max_side=None):
+    """[Detect chessboard corners in many images over a process pool]
+
+    Arguments:
+        filenames {[list]} -- [image paths]
+        chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+    Keyword Arguments:
+        workers {int} -- [number of processes, None uses every core] (default: {None})
+        chunksize {int} -- [images handed to a worker at a time] (default: {4})
+        cache {[CornerCache]} -- [cache consulted before detection, misses are stored back] (default: {None})
+        max_side {int} -- [pyramid detection size, see find_corners] (default: {None})
+
+    Returns:
+        [tuple] -- [list of (corners, image_size) in input order, images per second]
+    """
+    start = time.perf_counter()
+    results = [cache.get(f, chessboard_size) if cache is not None else None for f in filenames]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            fresh = pool.map(partial(detect_image_corners, chessboard_size=chessboard_size, max_side=max_side),
+                             [filenames[i] for i in misses], chunksize=chunksize)
+            for i, (corners, image_size) in zip(misses, fresh):
+                results[i] = corners, image_size
+                if cache is not None:
+                    cache.put(filenames[i], chessboard_size, corners, image_size)
+    elapsed = time.perf_counter() - start
+    return results, len(filenames) / elapsed if elapsed > 0 else float('inf')
+
+
+class CornerCache:
+    """[On-disk cache of refined corners, one .npz entry per image]
+
+    Entries are keyed by a hash of the image bytes together with the board geometry and the
+    detection settings, so an edited image or a changed setting simply misses the cache.
+    """
+    # Bump when the entry layout or the detection pipeline changes.
+    VERSION = 1
+
+    def __init__(self, cache_dir='.corner_cache', flags=FIND_FLAGS, win_size=SUBPIX_WINDOW, criteria=SUBPIX_CRITERIA,
+                 max_side=None):
+        self.cache_dir = cache_dir
+        self.settings = (self.VERSION, flags, tuple(win_size), tuple(criteria), max_side)
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}
+        self._used = set()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, filename, chessboard_size):
+        """[Cache key of an image for the given board, hashed from the raw file bytes]"""
+        memo = (filename, tuple(chessboard_size))
+        if memo not in self._keys:
+            digest = hashlib.sha1(repr((tuple(chessboard_size), self.settings)).encode())
+            with open(filename, 'rb') as f:
+                digest.update(f.read())
+            self._keys[memo] = digest.hexdigest()
+        return self._keys[memo]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def get(self, filename, chessboard_size):
+        """[Look up an image without decoding it]
+
+        Returns:
+            [tuple] -- [(corners, image_size) as returned by detect_image_corners, or None on a miss]
+        """
+        try:
+            key = self.key(filename, chessboard_size)
+            with np.load(self._path(key)) as entry:
+                corners = entry['corners'] if entry['found'] else None
+                image_size = tuple(int(v) for v in entry['image_size'])
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        self._used.add(key)
+        self.hits += 1
+        return corners, image_size
+
+    def put(self, filename, chessboard_size, corners, image_size):
+        """[Store a detection result; unreadable images are not cached]"""
+        if image_size is None:
+            return
+        key = self.key(filename, chessboard_size)
+        found = corners is not None
+        tmp_path = self._path(key) + '.tmp.npz'
+        np.savez(tmp_path, found=found, image_size=np.array(image_size),
+                 corners=corners if found else np.zeros((0, 1, 2), np.float32))
+        os.replace(tmp_path, self._path(key))
+        self._used.add(key)
+
+    def prune(self):
+        """[Delete every entry that was not used since this cache was opened]
+
+        Returns:
+            [int] -- [number of entries removed]
+        """
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz') and name[:-4] not in self._used:
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        return removed
+
+
+class ChessboardTracker:
+    """[Frame-to-frame chessboard detection that searches around the last known board first]
+
+    While the board is tracked only a padded ROI around the previous corners is searched. After
+    `max_roi_misses` consecutive ROI misses the board counts as lost; full-frame searches are then
+    run only every `lost_interval` frames until it is found again.
+    """
+    def __init__(self, chessboard_size, padding=0.25, min_padding=40, max_roi_misses=3, lost_interval=5, max_side=None):
+        """[Initialize]
+
+        Arguments:
+            chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+
+        Keyword Arguments:
+            padding {float} -- [ROI padding as a fraction of the board's bounding box] (default: {0.25})
+            min_padding {int} -- [smallest ROI padding in pixels] (default: {40})
+            max_roi_misses {int} -- [consecutive ROI misses before the board counts as lost] (default: {3})
+            lost_interval {int} -- [frames between full-frame searches while lost] (default: {5})
+            max_side {int} -- [pyramid detection size, see find_corners] (default: {None})
+        """
+        self.chessboard_size = chessboard_size
+        self.padding = padding
+        self.min_padding = min_padding
+        self.max_roi_misses = max_roi_misses
+        self.lost_interval = lost_interval
+        self.max_side = max_side
+        self.corners = None
+        self._misses = 0
+        self._since_search = lost_interval
+
+        # Counters
+        self.frames = 0
+        self.roi_searches = 0
+        self.roi_hits = 0
+        self.full_searches = 0
+        self.skipped = 0
+        self.detection_time = 0.0
+        self._full_time = 0.0
+
+    def _find(self, gray):
+        return find_corners(gray, self.chessboard_size, max_side=self.max_side, fallback=False)
+
+    def track(self, gray):
+        """[Detect the board in the next frame]
+
+        Arguments:
+            gray {[np.array]} -- [grayscale frame]
+
+        Returns:
+            [np.array] -- [refined (N, 1, 2) corners, or None if the board was not found]
+        """
+        self.frames += 1
+        start = time.perf_counter()
+        corners = None
+        if self.corners is not None:
+            self.roi_searches += 1
+            h, w = gray.shape[:2]
+            low, high = self.corners.reshape(-1, 2).min(axis=0), self.corners.reshape(-1, 2).max(axis=0)
+            pad = max(self.min_padding, self.padding * (high - low).max())
+            x0, y0 = np.maximum(np.floor(low - pad).astype(int), 0)
+            x1, y1 = np.minimum(np.ceil(high + pad).astype(int), (w, h))
+            corners = self._find(gray[y0:y1, x0:x1])
+            if corners is not None:
+                corners += np.float32((x0, y0))
+                self.roi_hits += 1
+                self._misses = 0
+            else:
+                self._misses += 1
+                if self._misses >= self.max_roi_misses:
+                    self.corners = None
+                    self._since_search = self.lost_interval
+        elif self._since_search >= self.lost_interval:
+            corners = self._find(gray)
+            self.full_searches += 1
+            self._full_time += time.perf_counter() - start
+            self._since_search = 0
+        else:
+            self._since_search += 1
+            self.skipped += 1
+        if corners is not None:
+            self.corners = corners
+        self.detection_time += time.perf_counter() - start
+        return corners
+
+    def stats(self):
+        """[One-line summary, with the time saved against a full-frame search on every frame]"""
+        summary = (f"{self.frames} frames, {self.roi_hits}/{self.roi_searches} ROI hits, "
+                   f"{self.full_searches} full-frame searches, {self.skipped} skipped, "
+                   f"detection {1000 * self.detection_time:.0f} ms")
+        if self.full_searches:
+            saved = self.frames * self._full_time / self.full_searches - self.detection_time
+            summary += f", about {1000 * saved:.0f} ms saved"
+        return summary
+
+
+class FlowPoseTracker:
+    """[Board pose tracking that propagates the corners with pyramidal Lucas-Kanade flow]
+
+    A full detection (through a ChessboardTracker when one is given) runs every `redetect_every`
+    frames or whenever the flow quality drops; in between, the corners are tracked with
+    calcOpticalFlowPyrLK and the pose is re-solved with solvePnP from the previous rvec/tvec.
+    The tracked corners are replaced by the reprojected board after each solve, so they do not
+    drift away from a rigid board.
+    """
+    def __init__(self, chessboard_size, object_points, camera_matrix, dist_coeffs, tracker=None, max_side=None,
+                 redetect_every=15, min_tracked=0.9, max_error=1.5, win_size=(21, 21), max_level=3):
+        """[Initialize]
+
+        Arguments:
+            chessboard_size {[tuple]} -- [number of inner corners (cols, rows)]
+            object_points {[np.array]} -- [(N, 3) board corners]
+            camera_matrix {[np.array]} -- [camera intrinsic matrix]
+            dist_coeffs {[np.array]} -- [distortion coefficients]
+
+        Keyword Arguments:
+            tracker {[ChessboardTracker]} -- [detector used for full detections, None searches the full frame] (default: {None})
+            max_side {int} -- [pyramid level for full-frame detections without a tracker, see find_corners] (default: {None})
+            redetect_every {int} -- [largest number of flow frames between detections] (default: {15})
+            min_tracked {float} -- [smallest fraction of corners the flow must keep] (default: {0.9})
+            max_error {float} -- [largest RMS distance in pixels between flow and reprojected corners] (default: {1.5})
+            win_size {tuple} -- [Lucas-Kanade window] (default: {(21, 21)})
+            max_level {int} -- [Lucas-Kanade pyramid levels] (default: {3})
+        """
+        self.chessboard_size = chessboard_size
+        self.object_points = object_points
+        self.camera_matrix = camera_matrix
+        self.dist_coeffs = dist_coeffs
+        self.tracker = tracker
+        self.max_side = max_side
+        self.redetect_every = redetect_every
+        self.min_tracked = min_tracked
+        self.max_error = max_error
+        self.flow_params = dict(winSize=win_size, maxLevel=max_level,
+                                criteria=(cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.corners = None
+        self.rvec, self.tvec = None, None
+        self._previous = None
+        self._since_detect = 0
+
+        # Counters
+        self.frames = 0
+        self.flow_frames = 0
+        self.detections = 0
+        self.flow_failures = 0
+        self.flow_time = 0.0
+        self.detection_time = 0.0
+
+    def update(self, gray):
+        """[Estimate the board pose in the next frame]
+
+        Arguments:
+            gray {[np.array]} -- [grayscale frame; it is kept as the reference for the next flow step]
+
+        Returns:
+            [tuple] -- [(rvec, tvec), or None if the board was not found]
+        """
+        self.frames += 1
+        pose = None
+        if self.corners is not None and self._since_detect < self.redetect_every:
+            start = time.perf_counter()
+            pose = self._flow(gray)
+            self.flow_time += time.perf_counter() - start
+            if pose is None:
+                self.flow_failures += 1
+        if pose is None:
+            start = time.perf_counter()
+            pose = self._detect(gray)
+            self.detection_time += time.perf_counter() - start
+        self._previous = gray
+        return pose
+
+    def _solve(self, object_points, image_points):
+        guess = self.rvec is not None
+        return cv.solvePnP(object_points, image_points, self.camera_matrix, self.dist_coeffs,
+                           self.rvec.copy() if guess else None, self.tvec.copy() if guess else None,
+                           useExtrinsicGuess=guess)
+
+    def _detect(self, gray):
+        self.detections += 1
+        if self.tracker is not None:
+            corners = self.tracker.track(gray)
+        else:
+            corners = find_corners(gray, self.chessboard_size, max_side=self.max_side, fallback=False)
+        if corners is None:
+            self.corners, self.rvec, self.tvec = None, None, None
+            return None
+        ret, rvec, tvec = self._solve(self.object_points, corners)
+        if not ret:
+            self.corners, self.rvec, self.tvec = None, None, None
+            return None
+        self.corners, self.rvec, self.tvec = corners, rvec, tvec
+        self._since_detect = 0
+        return rvec, tvec
+
+    def _flow(self, gray):
+        points, status, _ = cv.calcOpticalFlowPyrLK(self._previous, gray, self.corners, None, **self.flow_params)
+        tracked = status.ravel() == 1
+        if tracked.mean() < self.min_tracked:
+            return None
+        ret, rvec, tvec = self._solve(self.object_points[tracked], points[tracked])
+        if not ret:
+            return None
+        projected, _ = cv.projectPoints(self.object_points, rvec, tvec, self.camera_matrix, self.dist_coeffs)
+        error = np.sqrt(np.mean(np.sum((projected[tracked] - points[tracked]) ** 2, axis=2)))
+        if error > self.max_error:
+            return None
+        self.corners, self.rvec, self.tvec = projected.astype(np.float32), rvec, tvec
+        if self.tracker is not None:
+            # Keep the detector's search ROI following the board.
+            self.tracker.corners = self.corners
+        self._since_detect += 1
+        self.flow_frames += 1
+        return rvec, tvec
+
+    def stats(self):
+        """[One-line summary of how the frames were handled]"""
+        flow_ms = 1000 * self.flow_time / max(self.flow_frames + self.flow_failures, 1)
+        detect_ms = 1000 * self.detection_time / max(self.detections, 1)
+        return (f"{self.frames} frames, {self.flow_frames} tracked by flow ({flow_ms:.2f} ms each), "
+                f"{self.detections} detections ({detect_ms:.2f} ms each), {self.flow_failures} flow failures")
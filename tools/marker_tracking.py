@@ -0,0 +1,201 @@
+import threading
+import time
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+from tools.Filter import Filter
+from tools.Visualize import draw_axis
+
+
+def extrapolate_pose(previous, current, timestamp, max_extrapolation=0.1):
+    """[Predict a marker pose at a later time from its last two measurements, at constant velocity]
+
+    Arguments:
+        previous {[tuple]} -- [(time, rvec, tvec) of the measurement before current, or None]
+        current {[tuple]} -- [(time, rvec, tvec) of the newest measurement]
+        timestamp {[float]} -- [time to predict the pose at, same clock as the measurements]
+
+    Keyword Arguments:
+        max_extrapolation {float} -- [longest prediction past the newest measurement, in seconds] (default: {0.1})
+
+    Returns:
+        [tuple] -- [(rvec, tvec)]
+    """
+    t1, rvec1, tvec1 = current
+    if previous is None or previous[0] >= t1:
+        return rvec1, tvec1
+    t0, rvec0, tvec0 = previous
+    ahead = min(max(timestamp - t1, 0.0), max_extrapolation) / (t1 - t0)
+    R0, _ = cv2.Rodrigues(rvec0)
+    R1, _ = cv2.Rodrigues(rvec1)
+    # Repeat the rotation from the previous to the newest measurement, scaled to the time ahead.
+    step, _ = cv2.Rodrigues(R1 @ R0.T)
+    turn, _ = cv2.Rodrigues(step * ahead)
+    rvec, _ = cv2.Rodrigues(turn @ R1)
+    return rvec, tvec1 + (tvec1 - tvec0) * ahead
+
+
+class MarkerPoseWorker:
+    """[Detect ArUco markers and estimate their poses on a worker thread, against the newest frame]
+
+    The worker always takes the newest frame of the source, copies it into a small ring of reused
+    buffers and publishes it with the timestamped poses of the markers found in it. The render
+    thread picks up the newest published frame with latest_frame() and asks for the poses at its
+    own display time with poses(), which extrapolates the last two measurements of every marker,
+    so drawing never waits for detection. process() does the work of one frame and can also be
+    called directly without starting the thread.
+    """
+    def __init__(self, source, camera_matrix, dist_coeffs, mark_size, dictionary=aruco.DICT_6X6_250,
+                 debug=False, max_extrapolation=0.1, buffers=3):
+        """[Initialize]
+
+        Arguments:
+            source {[object]} -- [frame source from tools.capture.open_frame_source]
+            camera_matrix {[np.array]} -- [camera intrinsic matrix]
+            dist_coeffs {[np.array]} -- [camera distortion coefficients]
+            mark_size {[float]} -- [aruco mark size: unit is meter]
+
+        Keyword Arguments:
+            dictionary {int} -- [predefined ArUco dictionary] (default: {aruco.DICT_6X6_250})
+            debug {bool} -- [also publish a copy of the frame with the marker axes drawn on it] (default: {False})
+            max_extrapolation {float} -- [longest pose prediction past the newest detection, in seconds] (default: {0.1})
+            buffers {int} -- [size of the published frame ring, at least 3] (default: {3})
+        """
+        self.source = source
+        self.camera_matrix, self.dist_coeffs = camera_matrix, dist_coeffs
+        self.mark_size = mark_size
+        self.debug = debug
+        self.max_extrapolation = max_extrapolation
+        parameters = aruco.DetectorParameters()
+        parameters.adaptiveThreshConstant = 7.0
+        self.detector = aruco.ArucoDetector(aruco.getPredefinedDictionary(dictionary), parameters)
+
+        self._lock = threading.Lock()
+        self._buffers = [None] * max(buffers, 3)
+        self._debug_buffers = [None] * len(self._buffers)
+        self._gray = None
+        self._latest = None      # slot of the newest published frame
+        self._reading = None     # slot held by the render thread
+        self._sequence = 0       # number of frames published so far
+        self._delivered = 0      # sequence number of the frame last handed to the render thread
+        self._measurements = {}  # marker id -> [(sequence, time, rvec, tvec) of the newest two detections]
+        self._visible = ()       # marker ids found in the newest frame
+        self._filters = {}       # marker id -> Filter holding the pose while the marker is still
+        self._running = False
+        self._thread = None
+
+        # Counters
+        self.frames_processed = 0
+        self.detect_time = 0.0
+
+    def start(self):
+        """[Start the worker thread]"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """[Stop the worker thread after the frame it is processing]"""
+        self._running = False
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.source.read()
+            if not ret:
+                # Nothing new yet, or the source ended: keep the last published frame.
+                time.sleep(0.005)
+                continue
+            timestamp = self.source.timestamp if self.source.timestamp is not None else time.perf_counter()
+            self.process(frame, timestamp)
+
+    def process(self, frame, timestamp):
+        """[Detect the markers of a frame and publish the frame with their poses]
+
+        Arguments:
+            frame {[np.array]} -- [BGR frame, copied so the source may reuse it afterwards]
+            timestamp {[float]} -- [capture time of the frame, time.perf_counter clock]
+        """
+        start = time.perf_counter()
+        with self._lock:
+            slot = 0
+            while slot in (self._latest, self._reading):
+                slot += 1
+        if self._buffers[slot] is None or self._buffers[slot].shape != frame.shape:
+            self._buffers[slot] = np.empty_like(frame)
+        image = self._buffers[slot]
+        np.copyto(image, frame)
+
+        if self._gray is None or self._gray.shape != image.shape[:2]:
+            self._gray = np.empty(image.shape[:2], np.uint8)
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        corners, ids, _ = self.detector.detectMarkers(self._gray)
+        detections = []
+        if ids is not None and corners is not None:
+            rvecs, tvecs, _ = aruco.estimatePoseSingleMarkers(corners, self.mark_size, self.camera_matrix, self.dist_coeffs)
+            detections = list(zip(ids.flatten().tolist(), rvecs.reshape(-1, 3), tvecs.reshape(-1, 3)))
+
+        if self.debug:
+            if self._debug_buffers[slot] is None or self._debug_buffers[slot].shape != image.shape:
+                self._debug_buffers[slot] = np.empty_like(image)
+            np.copyto(self._debug_buffers[slot], image)
+            for _, rvec, tvec in detections:
+                draw_axis(self._debug_buffers[slot], rvec, tvec, self.camera_matrix, self.dist_coeffs)
+
+        with self._lock:
+            sequence = self._sequence + 1
+            for marker_id, rvec, tvec in detections:
+                history = self._measurements.setdefault(marker_id, [])
+                if marker_id not in self._filters:
+                    self._filters[marker_id] = Filter()
+                if not self._filters[marker_id].update(tvec) and history:
+                    # The marker did not move: hold its last pose, at rest.
+                    rvec, tvec = history[-1][2], history[-1][3]
+                history.append((sequence, timestamp, rvec, tvec))
+                del history[:-2]
+            self._visible = tuple(marker_id for marker_id, _, _ in detections)
+            self._latest, self._sequence = slot, sequence
+        self.frames_processed += 1
+        self.detect_time += time.perf_counter() - start
+
+    def latest_frame(self):
+        """[Newest published frame, held for the render thread until its next call]
+
+        Returns:
+            [tuple] -- [(frame, debug frame or None, whether the frame is new since the last call);
+                       frame is None until the first frame is published]
+        """
+        with self._lock:
+            fresh = self._sequence > self._delivered
+            self._reading, self._delivered = self._latest, self._sequence
+        if self._reading is None:
+            return None, None, False
+        debug = self._debug_buffers[self._reading] if self.debug else None
+        return self._buffers[self._reading], debug, fresh
+
+    def poses(self, timestamp):
+        """[Poses of the markers found in the newest frame, extrapolated to a display time]
+
+        Arguments:
+            timestamp {[float]} -- [time to predict the poses at, time.perf_counter clock]
+
+        Returns:
+            [dict] -- [marker id -> (rvec, tvec)]
+        """
+        with self._lock:
+            histories = [(marker_id, list(self._measurements[marker_id])) for marker_id in self._visible]
+        poses = {}
+        for marker_id, history in histories:
+            current = history[-1][1:]
+            # Only a detection in the frame just before gives a velocity.
+            previous = history[0][1:] if len(history) == 2 and history[0][0] == history[1][0] - 1 else None
+            poses[marker_id] = extrapolate_pose(previous, current, timestamp, self.max_extrapolation)
+        return poses
+
+    def stats(self):
+        """[One-line summary of the worker]"""
+        mean = self.detect_time / self.frames_processed if self.frames_processed else 0.0
+        return f"{self.frames_processed} frames processed, {1000 * mean:.1f} ms per frame"
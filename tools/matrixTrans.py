@@ -1,11 +1,14 @@
 import numpy as np
 import cv2
-def extrinsic2ModelView(RVEC, TVEC, R_vector = True):
+def extrinsic2ModelView(RVEC, TVEC, R_vector = True, out = None):
     """[Get modelview matrix from RVEC and TVEC]
 
     Arguments:
         RVEC {[vector]} -- [Rotation vector]
         TVEC {[vector]} -- [Translation vector]
+
+    Keyword Arguments:
+        out {[np.array]} -- [16 float64 values to fill instead of allocating the matrix] (default: {None})
     """
     
     
@@ -19,6 +22,15 @@ def extrinsic2ModelView(RVEC, TVEC, R_vector = True):
 
     TVEC = TVEC.flatten().reshape((3, 1))
 
+    if out is not None:
+        # Same values as below, written column by column: Rx only flips the signs of rows 1 and 2.
+        M = out.reshape(4, 4)
+        M[:3, :3] = R.T
+        M[3, :3] = TVEC[:, 0]
+        M[:, 1:3] *= -1
+        M[:3, 3] = 0.0
+        M[3, 3] = 1.0
+        return out
     
     transform_matrix = Rx @ np.hstack((R, TVEC))
     M = np.eye(4)
@@ -0,0 +1,200 @@
+import hashlib
+import os
+
+import cv2 as cv
+import numpy as np
+from stl import mesh as stl_mesh
+
+# Bump when the layout of the cached mesh files changes.
+MESH_CACHE_VERSION = 1
+
+
+def indexed_mesh(triangles):
+    """[Split a triangle soup, such as the vectors of an STL mesh, into unique vertices and faces]
+
+    Arguments:
+        triangles {[np.array]} -- [(F, 3, 3) corner coordinates of every triangle]
+
+    Returns:
+        [tuple] -- [(vertices (V, 3) float32, faces (F, 3) int32 indices into vertices)]
+    """
+    vertices, inverse = np.unique(np.asarray(triangles, np.float32).reshape(-1, 3), axis=0, return_inverse=True)
+    return vertices, inverse.reshape(-1, 3).astype(np.int32)
+
+
+def face_normals(vertices, faces):
+    """[Unit normals of the faces following their winding, zero for degenerate triangles]"""
+    corners = np.asarray(vertices, np.float64)[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0).astype(np.float32)
+
+
+def file_digest(path):
+    """[sha1 of a file's contents, read in chunks]"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_mesh(path, cache_dir='.mesh_cache'):
+    """[Load an STL file as an indexed mesh through a binary cache keyed by the file contents]
+
+    The first load parses the STL with numpy-stl, removes duplicate vertices and stores the result
+    as plain .npy files; later loads only hash the file and memory-map the arrays.
+
+    Arguments:
+        path {string} -- [STL file]
+
+    Keyword Arguments:
+        cache_dir {string} -- [directory of the preprocessed meshes, None disables the cache] (default: {'.mesh_cache'})
+
+    Returns:
+        [tuple] -- [(vertices (V, 3) float32, faces (F, 3) int32, normals (F, 3) float32, bounds (2, 3) min and max)]
+    """
+    if cache_dir is None:
+        return _build_mesh(path)
+
+    prefix = os.path.join(cache_dir, f"{file_digest(path)}_v{MESH_CACHE_VERSION}")
+    try:
+        with np.load(prefix + '_meta.npz') as meta:
+            bounds = meta['bounds']
+        arrays = [np.load(f"{prefix}_{name}.npy", mmap_mode='r') for name in ('vertices', 'faces', 'normals')]
+        return (*arrays, bounds)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    vertices, faces, normals, bounds = _build_mesh(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, array in (('vertices', vertices), ('faces', faces), ('normals', normals)):
+        np.save(f"{prefix}_{name}.npy", array)
+    # The metadata is written last, so an interrupted write never looks complete.
+    np.savez(prefix + '_meta.npz', bounds=bounds, source=os.path.basename(path))
+    return vertices, faces, normals, bounds
+
+
+def _build_mesh(path):
+    vertices, faces = indexed_mesh(stl_mesh.Mesh.from_file(path).vectors)
+    bounds = np.array([vertices.min(axis=0), vertices.max(axis=0)])
+    return vertices, faces, face_normals(vertices, faces), bounds
+
+
+def fit_vertices(vertices, bounds, size=1.0):
+    """[Center the mesh on its bounding box and scale its largest side to `size`]
+
+    Arguments:
+        vertices {[np.array]} -- [(V, 3) vertices]
+        bounds {[np.array]} -- [(2, 3) bounding box minimum and maximum, see load_mesh]
+
+    Keyword Arguments:
+        size {float} -- [length of the largest side after scaling] (default: {1.0})
+
+    Returns:
+        [np.array] -- [(V, 3) transformed vertices]
+    """
+    min_coords, max_coords = bounds
+    model_size = max_coords - min_coords
+    return (vertices - min_coords - model_size / 2) * (size / max(model_size))
+
+
+def project_faces(vertices, faces, rvec, tvec, camera_matrix, dist_coeffs):
+    """[Project the unique vertices once and gather the 2D triangle of every face]
+
+    Arguments:
+        vertices {[np.array]} -- [(V, 3) unique vertices]
+        faces {[np.array]} -- [(F, 3) vertex indices]
+        rvec {[np.array]} -- [rotation vector of the model]
+        tvec {[np.array]} -- [translation vector of the model]
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+        dist_coeffs {[np.array]} -- [distortion coefficients]
+
+    Returns:
+        [np.array] -- [(F, 3, 2) int32 pixel coordinates of the face corners]
+    """
+    image_points, _ = cv.projectPoints(vertices, rvec, tvec, camera_matrix, dist_coeffs)
+    return np.int32(image_points).reshape(-1, 2)[faces]
+
+
+def fill_faces(frame, polygons, color):
+    """[Fill projected triangles on the frame]
+
+    A single cv.fillPoly call over many polygons fills by the even-odd rule, so faces that overlap
+    on screen would cancel out; each triangle is therefore filled by its own call.
+
+    Arguments:
+        frame {[np.array]} -- [image drawn on in place]
+        polygons {[np.array]} -- [(F, 3, 2) int32 triangles, see project_faces]
+        color {[tuple]} -- [fill color]
+    """
+    for polygon in polygons:
+        cv.fillPoly(frame, [polygon], color)
+
+
+class MeshRenderer:
+    """[OpenCV/NumPy overlay renderer for indexed meshes, no OpenGL needed]
+
+    Faces whose normal points away from the camera are culled, the rest are painted far to near
+    (painter's algorithm on the mean camera depth of each face) and shaded by the angle between
+    their normal and the viewing ray. Face normals follow the winding of the triangles, which in
+    STL files points out of the model.
+    """
+    def __init__(self, vertices, faces, normals=None, color=(0, 255, 0), ambient=0.35, cull=True):
+        """[Initialize]
+
+        Arguments:
+            vertices {[np.array]} -- [(V, 3) unique vertices]
+            faces {[np.array]} -- [(F, 3) vertex indices]
+
+        Keyword Arguments:
+            normals {[np.array]} -- [(F, 3) unit face normals, computed from the winding when None] (default: {None})
+            color {tuple} -- [BGR color of a face seen head-on] (default: {(0, 255, 0)})
+            ambient {float} -- [brightness of a face seen edge-on, 0 to 1] (default: {0.35})
+            cull {bool} -- [skip faces turned away from the camera] (default: {True})
+        """
+        self.vertices = np.asarray(vertices, np.float64)
+        self.faces = np.asarray(faces, np.int32)
+        normals = np.asarray(face_normals(self.vertices, self.faces) if normals is None else normals, np.float64)
+        # Degenerate triangles have no area and nothing to draw.
+        keep = normals.any(axis=1)
+        self.faces = self.faces[keep]
+        self.normals = normals[keep]
+        self.color = np.asarray(color, np.float64)
+        self.ambient = ambient
+        self.cull = cull
+        self.faces_drawn = 0
+
+    def draw(self, frame, rvec, tvec, camera_matrix, dist_coeffs):
+        """[Render the mesh on the frame in place for a pose from solvePnP]
+
+        Arguments:
+            frame {[np.array]} -- [BGR image drawn on in place]
+            rvec {[np.array]} -- [rotation vector of the model]
+            tvec {[np.array]} -- [translation vector of the model]
+            camera_matrix {[np.array]} -- [camera intrinsic matrix]
+            dist_coeffs {[np.array]} -- [distortion coefficients]
+
+        Returns:
+            [int] -- [number of faces drawn]
+        """
+        R = cv.Rodrigues(np.asarray(rvec, np.float64))[0]
+        camera_vertices = self.vertices @ R.T + np.asarray(tvec, np.float64).reshape(1, 3)
+        centers = camera_vertices[self.faces].mean(axis=1)
+        normals = self.normals @ R.T
+        # The camera sits at the origin, so -centers points from each face to the camera.
+        facing = -np.sum(normals * centers, axis=1) / np.linalg.norm(centers, axis=1)
+        visible = (camera_vertices[self.faces][:, :, 2] > 0).all(axis=1)
+        if self.cull:
+            visible &= facing > 0
+        order = np.flatnonzero(visible)
+        order = order[np.argsort(-centers[order, 2], kind='stable')]
+
+        image_points, _ = cv.projectPoints(self.vertices, rvec, tvec, camera_matrix, dist_coeffs)
+        polygons = np.int32(image_points).reshape(-1, 2)[self.faces[order]]
+        shade = self.ambient + (1 - self.ambient) * np.abs(facing[order])
+        colors = (shade[:, None] * self.color).round().astype(np.int32).tolist()
+        for polygon, color in zip(polygons, colors):
+            cv.fillPoly(frame, [polygon], color)
+        self.faces_drawn = len(order)
+        return self.faces_drawn
@@ -1,7 +1,23 @@
+import ctypes
+import hashlib
+import json
+import os
+import re
+import struct
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pygame
 from OpenGL.GL import *
 
-def MTL(dir, filename):
+from tools.textures import TextureManager, decode_texture, upload_texture
+
+# Textures shared by all models that are not given their own manager.
+TEXTURES = TextureManager()
+
+def parse_mtl(dir, filename):
+    """[Read an MTL file without loading its textures; map_Kd holds the texture path]"""
     contents = {}
     mtl = None
     for line in open(dir + filename, "r"):
@@ -13,95 +29,452 @@ def MTL(dir, filename):
         elif mtl is None:
             raise (ValueError, "mtl file doesn't start with newmtl stmt")
         elif values[0] == 'map_Kd':
-            # load the texture referred to by this declaration
             mtl[values[0]] = dir + values[1]
-            surf = pygame.image.load(mtl['map_Kd'])
-            image = pygame.image.tostring(surf, 'RGBA', 1)
-            ix, iy = surf.get_rect().size
-            texid = mtl['texture_Kd'] = glGenTextures(1)
-            # print('texid', texid)
-            # texid = 10
-            glBindTexture(GL_TEXTURE_2D, texid)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER,
-                GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER,
-                GL_LINEAR)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ix, iy, 0, GL_RGBA,
-                GL_UNSIGNED_BYTE, image)
         else:
             mtl[values[0]] = list(map(float, values[1:]))
     return contents
 
+
+def MTL(dir, filename, textures=None):
+    textures = textures or TEXTURES
+    contents = parse_mtl(dir, filename)
+    # Decode all textures in parallel, then upload each distinct image once.
+    decoding = {name: textures.decode(mtl['map_Kd']) for name, mtl in contents.items() if 'map_Kd' in mtl}
+    for name, future in decoding.items():
+        contents[name]['texture_Kd'] = textures.acquire(*future.result())
+    return contents
+
+# Value part of every record of one type, e.g. RECORD % 'vn'. The patterns start with the line
+# break instead of '^', which lets the regex engine skip ahead to candidate lines; the parsed
+# text is prefixed with a line break so the first line matches too.
+RECORD = r'\n[ \t]*%s[ \t]+([^\n]*)'
+MATERIAL_RECORD = re.compile(r'\n[ \t]*(?:usemtl|usemat)[ \t]+(\S+)[^\n]*')
+MTLLIB_RECORD = re.compile(r'\n[ \t]*mtllib[ \t]+(\S+)')
+
+
+def _float_rows(text, kind, width):
+    """[Values of every `kind` record ('v', 'vn' or 'vt') as a (count, width) float32 array]"""
+    lines = re.findall(RECORD % kind, text)
+    if not lines:
+        return np.zeros((0, width), np.float32)
+    columns = len(lines[0].split())
+    values = np.fromstring('\n'.join(lines), dtype=np.float32, sep=' ')
+    if columns >= width and values.size == columns * len(lines):
+        return values.reshape(-1, columns)[:, :width]
+    # Lines with differing numbers of values, e.g. optional w components.
+    return np.array([line.split()[:width] for line in lines], np.float32)
+
+
+def _polygon_corners(lines):
+    """[Split 'f' record values into corner counts and a (corners, 3) array of 1-based [vertex, texcoord, normal] indices, 0 if missing]"""
+    if not lines:
+        return np.zeros(0, np.int64), np.zeros((0, 3), np.int64)
+    text = '\n'.join(lines)
+    chars = np.frombuffer(text.encode(), np.uint8)
+    blank = (chars == ord(' ')) | (chars == ord('\t')) | (chars == ord('\r')) | (chars == ord('\n'))
+    token_starts = np.flatnonzero(~blank & np.r_[True, blank[:-1]])
+    line_starts = np.r_[0, np.flatnonzero(chars == ord('\n')) + 1]
+    # Corners per polygon: the token starts that fall into each line.
+    counts = np.diff(np.searchsorted(token_starts, np.r_[line_starts, len(chars)]))
+
+    corners = np.zeros((len(token_starts), 3), np.int64)
+    slashes = np.add.reduceat((chars == ord('/')).astype(np.int64), token_starts)
+    layout = slashes[0]
+    if layout <= 2 and (slashes == layout).all():
+        values = np.fromstring(text.replace('//', '/0/').replace('/', ' '), dtype=np.int64, sep=' ')
+        if values.size == (layout + 1) * len(token_starts):
+            corners[:, :layout + 1] = values.reshape(-1, layout + 1)
+            return counts, corners
+    # Mixed corner layouts within one file.
+    for i, token in enumerate(text.split()):
+        for j, value in enumerate(token.split('/')[:3]):
+            if value:
+                corners[i, j] = int(value)
+    return counts, corners
+
+
+def parse_obj(filename, swapyz=False):
+    """[Parse a Wavefront OBJ file into NumPy arrays, without touching OpenGL]
+
+    The file is read once and the records of each type are pulled out with regular expressions
+    and converted in bulk. Polygons are fan-triangulated, which matches drawing them as GL_POLYGON
+    for the convex faces OBJ exporters write.
+
+    Arguments:
+        filename {string} -- [OBJ file]
+
+    Keyword Arguments:
+        swapyz {bool} -- [swap the y and z axes of the vertices and normals] (default: {False})
+
+    Returns:
+        [dict] -- [vertices (V, 3), normals (N, 3), texcoords (T, 2) float32 arrays; faces (F, 3, 3)
+                   int32 triangles of [vertex, texcoord, normal] 0-based indices, -1 if missing;
+                   face_materials (F,) int32 indices into materials, the list of usemtl names
+                   (None for faces before the first usemtl); mtllib, the material library or None]
+    """
+    with open(filename, "r") as file:
+        text = '\n' + file.read()
+
+    vertices = _float_rows(text, 'v', 3)
+    normals = _float_rows(text, 'vn', 3)
+    texcoords = _float_rows(text, 'vt', 2)
+    if swapyz:
+        vertices = vertices[:, [0, 2, 1]]
+        normals = normals[:, [0, 2, 1]]
+    mtllib = MTLLIB_RECORD.search(text)
+
+    # Split at the usemtl records: sections[0] has no material, then name and section pairs.
+    sections = MATERIAL_RECORD.split(text)
+    names = [None] + sections[1::2]
+    materials, polygons, polygon_materials = [], [], []
+    for name, section in zip(names, sections[::2]):
+        lines = re.findall(RECORD % 'f', section)
+        if not lines:
+            continue
+        if name not in materials:
+            materials.append(name)
+        polygons += lines
+        polygon_materials.append(np.full(len(lines), materials.index(name), np.int32))
+    counts, corners = _polygon_corners(polygons)
+    corners -= 1
+
+    # Fan triangulation: corners (0, k, k + 1) of every polygon for k = 1 .. n - 2.
+    triangles = np.maximum(counts - 2, 0)
+    first = np.repeat(np.cumsum(counts) - counts, triangles)
+    k = np.arange(triangles.sum()) - np.repeat(np.cumsum(triangles) - triangles, triangles) + 1
+    faces = corners[np.stack([first, first + k, first + k + 1], axis=1)].astype(np.int32)
+    face_materials = np.repeat(np.concatenate(polygon_materials or [np.zeros(0, np.int32)]), triangles)
+
+    return {'vertices': vertices, 'normals': normals, 'texcoords': texcoords, 'faces': faces,
+            'face_materials': face_materials, 'materials': materials,
+            'mtllib': mtllib.group(1) if mtllib else None}
+
+
+# Compiled models: a single file per OBJ with the interleaved vertex data grouped by material and
+# the decoded textures, memory-mapped on load. Bump the version when the layout changes.
+ASSET_MAGIC = b'OBJC'
+ASSET_VERSION = 2
+_ASSET_HEADER = struct.Struct('<4sIQ')  # magic, version, length of the JSON header
+_ASSET_ALIGN = 64
+
+
+def _sources_state(paths):
+    """[(path, mtime, size) of the files a compiled model was built from]"""
+    return [[path, os.stat(path).st_mtime_ns, os.stat(path).st_size] for path in paths]
+
+
+def build_model(filename, swapyz=False, textures=None):
+    """[Turn an OBJ file, its MTL and its textures into draw-ready arrays, without touching OpenGL]
+
+    Arguments:
+        filename {string} -- [OBJ file]
+
+    Keyword Arguments:
+        swapyz {bool} -- [swap the y and z axes of the vertices and normals] (default: {False})
+        textures {[TextureManager]} -- [decoder of the textures, the shared one when None] (default: {None})
+
+    Returns:
+        [tuple] -- [(header, arrays): header holds the materials, the draws (material, first, count
+                   and whether all corners have normals and texcoords), the texture paths with their
+                   content digests and the source files; arrays holds 'vertex_data', (N, 8) float32
+                   triangle corners laid out as GL_T2F_N3F_V3F and grouped by material, and a
+                   'texture_<digest>' RGBA array per distinct image]
+    """
+    dir = filename[: filename.rfind('/') + 1]
+    data = parse_obj(filename, swapyz)
+    sources = [filename]
+    mtl = {}
+    if data['mtllib'] is not None:
+        mtl = parse_mtl(dir, data['mtllib'])
+        sources.append(dir + data['mtllib'])
+
+    # Decode every texture once and in parallel, even when several materials share it.
+    manager = textures or TEXTURES
+    arrays, textures, materials = {}, [], {}
+    for name, values in mtl.items():
+        materials[name] = {key: value for key, value in values.items() if key != 'map_Kd'}
+        if 'map_Kd' in values:
+            if values['map_Kd'] not in textures:
+                textures.append(values['map_Kd'])
+            materials[name]['texture'] = textures.index(values['map_Kd'])
+    digests = []
+    for future in [manager.decode(path) for path in textures]:
+        digest, image = future.result()
+        arrays[f"texture_{digest}"] = image
+        digests.append(digest)
+
+    order = np.argsort(data['face_materials'], kind='stable')
+    face_materials = data['face_materials'][order]
+    corners = data['faces'][order].reshape(-1, 3)
+    has_texcoord, has_normal = corners[:, 1] >= 0, corners[:, 2] >= 0
+    vertex_data = np.zeros((len(corners), 8), np.float32)
+    vertex_data[has_texcoord, 0:2] = data['texcoords'][corners[has_texcoord, 1]]
+    vertex_data[has_normal, 2:5] = data['normals'][corners[has_normal, 2]]
+    vertex_data[:, 5:8] = data['vertices'][corners[:, 0]]
+    arrays['vertex_data'] = vertex_data
+
+    draws, first = [], 0
+    for index, count in enumerate((np.bincount(face_materials, minlength=len(data['materials'])) * 3).tolist()):
+        if count == 0:
+            continue
+        run = slice(first, first + count)
+        draws.append({'material': data['materials'][index], 'first': first, 'count': count,
+                      'normals': bool(has_normal[run].all()), 'texcoords': bool(has_texcoord[run].all())})
+        first += count
+
+    header = {'materials': materials, 'draws': draws, 'textures': textures, 'texture_digests': digests,
+              'sources': _sources_state(sources + textures)}
+    return header, arrays
+
+
+def _write_asset(path, header, arrays):
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        offset = -(-offset // _ASSET_ALIGN) * _ASSET_ALIGN
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    text = json.dumps(dict(header, arrays=entries)).encode()
+    base = -(-(_ASSET_HEADER.size + len(text)) // _ASSET_ALIGN) * _ASSET_ALIGN
+    # Write to a temporary name first, so an interrupted write never looks complete.
+    with open(path + '.tmp', 'wb') as file:
+        file.write(_ASSET_HEADER.pack(ASSET_MAGIC, ASSET_VERSION, len(text)) + text)
+        for name, array in arrays.items():
+            file.seek(base + entries[name]['offset'])
+            file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(path + '.tmp', path)
+
+
+def _read_asset(path):
+    with open(path, 'rb') as file:
+        magic, version, length = _ASSET_HEADER.unpack(file.read(_ASSET_HEADER.size))
+        if magic != ASSET_MAGIC or version != ASSET_VERSION:
+            raise ValueError(f"{path} is not a compiled model of version {ASSET_VERSION}")
+        header = json.loads(file.read(length))
+    base = -(-(_ASSET_HEADER.size + length) // _ASSET_ALIGN) * _ASSET_ALIGN
+    blob = np.memmap(path, np.uint8, 'r')
+    arrays = {}
+    for name, entry in header.pop('arrays').items():
+        dtype, start = np.dtype(entry['dtype']), base + entry['offset']
+        size = dtype.itemsize * int(np.prod(entry['shape']))
+        arrays[name] = blob[start:start + size].view(dtype).reshape(entry['shape'])
+    return header, arrays
+
+
+def load_model(filename, swapyz=False, cache_dir='.model_cache', textures=None):
+    """[Load a compiled model, compiling it first when it is missing or its sources changed]
+
+    The compiled file is keyed by the OBJ path and swapyz and remembers the mtime and size of the
+    OBJ, MTL and texture files; it is rebuilt as soon as any of them changes.
+
+    Arguments:
+        filename {string} -- [OBJ file]
+
+    Keyword Arguments:
+        swapyz {bool} -- [swap the y and z axes of the vertices and normals] (default: {False})
+        cache_dir {string} -- [directory of the compiled models, None disables the cache] (default: {'.model_cache'})
+        textures {[TextureManager]} -- [decoder of the textures when compiling, the shared one when None] (default: {None})
+
+    Returns:
+        [tuple] -- [(header, arrays), see build_model; the arrays are memory-mapped when loaded from the cache]
+    """
+    if cache_dir is None:
+        return build_model(filename, swapyz, textures)
+
+    key = hashlib.sha1(f"{os.path.abspath(filename)}|{swapyz}".encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(filename))[0]
+    path = os.path.join(cache_dir, f"{name}_{key}.objc")
+    try:
+        header, arrays = _read_asset(path)
+        if header['sources'] == _sources_state([source for source, _, _ in header['sources']]):
+            return header, arrays
+    except (OSError, KeyError, ValueError):
+        pass
+
+    header, arrays = build_model(filename, swapyz, textures)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_asset(path, header, arrays)
+    return header, arrays
+
+
 # TODO load more format models
 class OBJ:
-    def __init__(self, filename, swapyz=False):
+    def __init__(self, filename, swapyz=False, cache_dir='.model_cache', use_vbo=True, textures=None, model=None):
         
         self.dir = filename[: filename.rfind('/') + 1]        
         
-        """Loads a Wavefront OBJ file. """
-        self.vertices = []
-        self.normals = []
-        self.texcoords = []
-        self.faces = []
-
-        material = None
-        for line in open(filename, "r"):
-            if line.startswith('#'): continue
-            values = line.split()
-            if not values: continue
-            if values[0] == 'v':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.vertices.append(v)
-            elif values[0] == 'vn':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.normals.append(v)
-            elif values[0] == 'vt':
-                self.texcoords.append(list(map(float, values[1:3])))
-            elif values[0] in ('usemtl', 'usemat'):
-                material = values[1]
-                # print('debug values', values[1])
-            elif values[0] == 'mtllib':
-                self.mtl = MTL(self.dir, values[1])
-            elif values[0] == 'f':
-                face = []
-                texcoords = []
-                norms = []
-                for v in values[1:]:
-                    w = v.split('/')
-                    face.append(int(w[0]))
-                    if len(w) >= 2 and len(w[1]) > 0:
-                        texcoords.append(int(w[1]))
-                    else:
-                        texcoords.append(0)
-                    if len(w) >= 3 and len(w[2]) > 0:
-                        norms.append(int(w[2]))
-                    else:
-                        norms.append(0)
-                self.faces.append((face, norms, texcoords, material))
-
-        self.gl_list = glGenLists(1)
-        glNewList(self.gl_list, GL_COMPILE)
+        """Loads a Wavefront OBJ file through its compiled model, see load_model.
+
+        With use_vbo the interleaved vertex data is uploaded once into a vertex buffer and render()
+        issues one glDrawArrays per material; otherwise it is compiled into a display list.
+        Textures are shared with every other model of the same TextureManager; call release()
+        to free the model's GL objects. A (header, arrays) pair already returned by load_model,
+        e.g. on a loader thread, can be passed as model to only do the GL part here. """
+        self.textures = textures or TEXTURES
+        header, arrays = model or load_model(filename, swapyz, cache_dir, self.textures)
+        self.vertex_data = arrays['vertex_data']
+        self.draws = header['draws']
+        self.texture_ids = [self.textures.acquire(digest, arrays[f"texture_{digest}"])
+                            for digest in header['texture_digests']]
+        self.mtl = {}
+        for name, material in header['materials'].items():
+            mtl = self.mtl[name] = dict(material)
+            if 'texture' in material:
+                mtl['map_Kd'] = header['textures'][material['texture']]
+                mtl['texture_Kd'] = self.texture_ids[material['texture']]
+
+        # GPU memory held by the model, counting its textures (mipmaps add a third) even when shared.
+        self.gpu_bytes = self.vertex_data.nbytes + sum(
+            arrays[f"texture_{digest}"].nbytes * 4 // 3 for digest in header['texture_digests'])
+
+        vertex_data = np.ascontiguousarray(self.vertex_data)
+        self.gl_list, self.vbo = None, None
+        if use_vbo:
+            self.vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferData(GL_ARRAY_BUFFER, vertex_data.nbytes, vertex_data, GL_STATIC_DRAW)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        else:
+            # The display list copies the arrays when it is compiled.
+            self.gl_list = glGenLists(1)
+            glNewList(self.gl_list, GL_COMPILE)
+            self._draw(vertex_data.ctypes.data)
+            glEndList()
+
+    def release(self):
+        """Frees the vertex buffer or display list and drops the model's texture references. """
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+        if self.gl_list is not None:
+            glDeleteLists(self.gl_list, 1)
+        for texid in self.texture_ids:
+            self.textures.release(texid)
+        self.gl_list, self.vbo, self.texture_ids = None, None, []
+
+    def render(self):
+        """Draws the model with the current matrices. """
+        if self.vbo is None:
+            glCallList(self.gl_list)
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        self._draw(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def _draw(self, address):
+        # address is the start of the vertex data: a client pointer, or 0 in the bound buffer.
         glFrontFace(GL_CCW)
-        for face in self.faces:
-            vertices, normals, texture_coords, material = face
-            mtl = self.mtl[material]
+        stride = self.vertex_data.strides[0]
+        glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(address))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(address + 8))
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(address + 20))
+        glEnableClientState(GL_VERTEX_ARRAY)
+        # One draw call per material.
+        for draw in self.draws:
+            mtl = self.mtl[draw['material']]
             if 'texture_Kd' in mtl:
                 # use diffuse texmap
                 glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
             else:
                 # just use diffuse colour
                 glColor3f(*mtl['Kd'])
-            glBegin(GL_POLYGON)            
-            for i in range(len(vertices)):
-                if normals[i] > 0:
-                    glNormal3fv(self.normals[normals[i] - 1])
-                if texture_coords[i] > 0 and 'texture_Kd' in mtl:
-                    glTexCoord2fv(self.texcoords[texture_coords[i] - 1])
-                glVertex3fv(self.vertices[vertices[i] - 1])
-            glEnd()
+            for state, enabled in ((GL_NORMAL_ARRAY, draw['normals']),
+                                   (GL_TEXTURE_COORD_ARRAY, draw['texcoords'] and 'texture_Kd' in mtl)):
+                if enabled:
+                    glEnableClientState(state)
+                else:
+                    glDisableClientState(state)
+            glDrawArrays(GL_TRIANGLES, draw['first'], draw['count'])
+        for state in (GL_VERTEX_ARRAY, GL_NORMAL_ARRAY, GL_TEXTURE_COORD_ARRAY):
+            glDisableClientState(state)
         glColor3f(1.0,1.0,1.0) # Clear the painting color.
-        glEndList()
\ No newline at end of file
+
+
+class ModelCache:
+    """[Models of a marker catalog, loaded on first use and evicted when they are not seen]
+
+    get() starts loading a model on a worker thread the first time it is asked for and returns
+    None until it is ready; the thread only reads and compiles files (see load_model) and the GL
+    objects are created by the get() call that finds the load finished. Models are kept in least
+    recently seen order and released once their GPU memory exceeds budget_bytes. Keys sharing a
+    path share one model. get() issues GL calls and must run on the thread that owns the context.
+    """
+    def __init__(self, paths, swapyz=False, budget_bytes=256 << 20, cache_dir='.model_cache', use_vbo=True,
+                 textures=None, workers=2):
+        """[Initialize]
+
+        Arguments:
+            paths {[dict]} -- [dictionary mapping keys, e.g. marker IDs, to OBJ files]
+
+        Keyword Arguments:
+            swapyz {bool} -- [swap the y and z axes of the vertices and normals] (default: {False})
+            budget_bytes {int} -- [GPU memory of the resident models before the least recently seen are released] (default: {256 MB})
+            cache_dir {string} -- [directory of the compiled models, see load_model] (default: {'.model_cache'})
+            use_vbo {bool} -- [draw from vertex buffers, see OBJ] (default: {True})
+            textures {[TextureManager]} -- [texture manager of the models, the shared one when None] (default: {None})
+            workers {int} -- [loader threads] (default: {2})
+        """
+        self.paths = dict(paths)
+        self.swapyz, self.budget_bytes, self.cache_dir, self.use_vbo = swapyz, budget_bytes, cache_dir, use_vbo
+        self.textures = textures or TEXTURES
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='model')
+        self._pending = {}              # path -> future of load_model
+        self._models = OrderedDict()    # path -> OBJ, least recently seen first
+        self._failed = set()
+        self.gpu_bytes = 0
+
+        # Counters
+        self.loaded = 0
+        self.evicted = 0
+
+    def __contains__(self, key):
+        return key in self.paths
+
+    def get(self, key):
+        """[Model of a key, or None while it is loading, when its load failed or the key is unknown]"""
+        path = self.paths.get(key)
+        model = self._models.get(path)
+        if model is not None:
+            self._models.move_to_end(path)
+            return model
+        if path is None or path in self._failed:
+            return None
+        future = self._pending.get(path)
+        if future is None:
+            self._pending[path] = self._executor.submit(load_model, path, self.swapyz, self.cache_dir, self.textures)
+            return None
+        if not future.done():
+            return None
+        del self._pending[path]
+        try:
+            model = OBJ(path, self.swapyz, use_vbo=self.use_vbo, textures=self.textures, model=future.result())
+        except Exception as error:
+            print(f"Failed to load model {path}: {error}")
+            self._failed.add(path)
+            return None
+        self._models[path] = model
+        self.gpu_bytes += model.gpu_bytes
+        self.loaded += 1
+        # Keep at least the model just loaded, even when it is larger than the budget.
+        while self.gpu_bytes > self.budget_bytes and len(self._models) > 1:
+            _, evicted = self._models.popitem(last=False)
+            evicted.release()
+            self.gpu_bytes -= evicted.gpu_bytes
+            self.evicted += 1
+        return model
+
+    def loading(self, key):
+        """[Whether the model of a key is being loaded]"""
+        return self.paths.get(key) in self._pending
+
+    def release(self):
+        """[Release every resident model and stop the loader threads]"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for model in self._models.values():
+            model.release()
+        self._models.clear()
+        self._pending.clear()
+        self.gpu_bytes = 0
+
+    def stats(self):
+        """[One-line summary of the cache]"""
+        return (f"{len(self._models)} resident ({self.gpu_bytes / 2**20:.1f} MB), {len(self._pending)} loading, "
+                f"{self.loaded} loaded, {self.evicted} evicted, {len(self._failed)} failed")
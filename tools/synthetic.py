@@ -0,0 +1,118 @@
+import cv2 as cv
+import numpy as np
+
+from tools.chessboard import board_object_points, chessboard_pattern
+
+
+class BoardRenderer:
+    """[Render the printable chessboard as seen by a camera with known intrinsics and distortion]
+
+    The normalized ray of every output pixel is computed once per camera; each view then only
+    maps those rays through the board homography and remaps the printed pattern.
+    """
+    def __init__(self, camera_matrix, dist_coeffs, image_size, chessboard_size=(9, 6), square_size=1.0,
+                 square_pixels=40, margin=1.0, background=90):
+        """[Initialize]
+
+        Arguments:
+            camera_matrix {[np.array]} -- [ground-truth intrinsic matrix]
+            dist_coeffs {[np.array]} -- [ground-truth distortion coefficients]
+            image_size {[tuple]} -- [(width, height) of the rendered views]
+
+        Keyword Arguments:
+            chessboard_size {tuple} -- [number of inner corners (cols, rows)] (default: {(9, 6)})
+            square_size {float} -- [size of one square in world units] (default: {1.0})
+            square_pixels {int} -- [resolution of the printed pattern] (default: {40})
+            margin {float} -- [white paper around the pattern, in squares] (default: {1.0})
+            background {int} -- [gray level outside the paper] (default: {90})
+        """
+        self.camera_matrix = np.asarray(camera_matrix, np.float64)
+        self.dist_coeffs = np.asarray(dist_coeffs, np.float64)
+        self.image_size = tuple(image_size)
+        self.chessboard_size = chessboard_size
+        self.square_size = square_size
+        self.object_points = board_object_points(chessboard_size, square_size)
+        self.background = background
+
+        pattern = cv.cvtColor(chessboard_pattern(chessboard_size, square_pixels), cv.COLOR_BGR2GRAY)
+        pad = int(round(margin * square_pixels))
+        self.pattern = cv.copyMakeBorder(pattern, pad, pad, pad, pad, cv.BORDER_CONSTANT, value=255)
+        # Inner corner (0, 0) sits one square plus the margin into the padded pattern. The filled
+        # rectangles include their end pixel, which moves every corner half a pixel down and right.
+        self.pattern_origin = square_pixels + pad
+        self.pattern_scale = square_pixels / square_size
+
+        w, h = self.image_size
+        pixels = np.mgrid[0:h, 0:w][::-1].reshape(2, -1).T.astype(np.float64).reshape(-1, 1, 2)
+        rays = cv.undistortPoints(pixels, self.camera_matrix, self.dist_coeffs).reshape(-1, 2)
+        self.rays = np.hstack((rays, np.ones((len(rays), 1))))
+
+    def random_pose(self, rng, max_tilt=45.0, coverage=(0.3, 0.8), margin=10):
+        """[Draw a random board pose with every inner corner inside the image]
+
+        Arguments:
+            rng {[np.random.Generator]} -- [random number generator]
+
+        Keyword Arguments:
+            max_tilt {float} -- [largest tilt out of the image plane, in degrees] (default: {45.0})
+            coverage {tuple} -- [range of the image width spanned by the untilted board] (default: {(0.3, 0.8)})
+            margin {int} -- [pixels kept between the outer corners and the image border] (default: {10})
+
+        Returns:
+            [tuple] -- [(rvec, tvec)]
+        """
+        w, h = self.image_size
+        center = self.object_points.mean(axis=0)
+        while True:
+            tilt = np.radians(rng.uniform(-max_tilt, max_tilt, 2))
+            roll = np.radians(rng.uniform(-30.0, 30.0))
+            R = cv.Rodrigues(np.array([tilt[0], tilt[1], 0.0]))[0] @ cv.Rodrigues(np.array([0.0, 0.0, roll]))[0]
+            board_width = (self.chessboard_size[0] + 1) * self.square_size
+            z = self.camera_matrix[0, 0] * board_width / (rng.uniform(*coverage) * w)
+            target = np.array([rng.uniform(-0.3, 0.3) * w, rng.uniform(-0.3, 0.3) * h, 0.0])
+            target = np.array([target[0] * z / self.camera_matrix[0, 0], target[1] * z / self.camera_matrix[1, 1], z])
+            rvec = cv.Rodrigues(R)[0].ravel()
+            tvec = target - R @ center
+            corners = self.project(rvec, tvec)
+            if (corners.min(axis=0) > margin).all() and (corners.max(axis=0) < (w - margin, h - margin)).all():
+                return rvec, tvec
+
+    def project(self, rvec, tvec):
+        """[Ground-truth (N, 2) positions of the inner corners for a pose]"""
+        points, _ = cv.projectPoints(self.object_points, rvec, tvec, self.camera_matrix, self.dist_coeffs)
+        return points.reshape(-1, 2)
+
+    def render(self, rvec, tvec, rng=None, blur_sigma=0.0, noise_sigma=0.0):
+        """[Render one grayscale view of the board]
+
+        Arguments:
+            rvec {[np.array]} -- [board rotation vector]
+            tvec {[np.array]} -- [board translation vector]
+
+        Keyword Arguments:
+            rng {[np.random.Generator]} -- [random number generator for the noise] (default: {None})
+            blur_sigma {float} -- [Gaussian blur in pixels] (default: {0.0})
+            noise_sigma {float} -- [Gaussian noise in gray levels] (default: {0.0})
+
+        Returns:
+            [np.array] -- [uint8 grayscale image]
+        """
+        # The board plane maps to normalized camera coordinates through H = [r1 r2 t].
+        R = cv.Rodrigues(np.asarray(rvec, np.float64))[0]
+        H = np.column_stack((R[:, 0], R[:, 1], np.asarray(tvec, np.float64).ravel()))
+        board = self.rays @ np.linalg.inv(H).T
+        # Rays that meet the board plane behind the camera see only the background.
+        behind = board[:, 2] <= 0
+        board = board[:, :2] / board[:, 2:3]
+        board[behind] = -1e6
+        w, h = self.image_size
+        map_x = (board[:, 0] * self.pattern_scale + self.pattern_origin).astype(np.float32).reshape(h, w)
+        map_y = (board[:, 1] * self.pattern_scale + self.pattern_origin).astype(np.float32).reshape(h, w)
+        image = cv.remap(self.pattern, map_x, map_y, cv.INTER_LINEAR,
+                         borderMode=cv.BORDER_CONSTANT, borderValue=self.background)
+        if blur_sigma > 0:
+            image = cv.GaussianBlur(image, (0, 0), blur_sigma)
+        if noise_sigma > 0:
+            rng = rng if rng is not None else np.random.default_rng()
+            image = np.clip(image + rng.normal(0, noise_sigma, image.shape), 0, 255).astype(np.uint8)
+        return image
@@ -0,0 +1,259 @@
+import ctypes
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+
+def decode_texture(source, namehint=''):
+    """[Decode an image into a bottom-up (height, width, 4) RGBA uint8 array, as glTexImage2D expects]
+
+    Arguments:
+        source {string or file} -- [image path or file object]
+
+    Keyword Arguments:
+        namehint {string} -- [file name telling pygame the format of a file object] (default: {''})
+
+    Returns:
+        [np.array] -- [RGBA pixels, first row at the bottom]
+    """
+    surf = pygame.image.load(source, namehint)
+    ix, iy = surf.get_rect().size
+    return np.frombuffer(pygame.image.tostring(surf, 'RGBA', 1), np.uint8).reshape(iy, ix, 4)
+
+
+def upload_texture(image, mipmaps=True):
+    """[Create a GL texture from an RGBA array from decode_texture and return its id]
+
+    Arguments:
+        image {[np.array]} -- [(height, width, 4) RGBA pixels]
+
+    Keyword Arguments:
+        mipmaps {bool} -- [generate mipmaps and filter between them when minifying] (default: {True})
+
+    Returns:
+        [int] -- [texture id]
+    """
+    iy, ix = image.shape[:2]
+    texid = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, texid)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER,
+        GL_LINEAR_MIPMAP_LINEAR if mipmaps else GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER,
+        GL_LINEAR)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ix, iy, 0, GL_RGBA,
+        GL_UNSIGNED_BYTE, np.ascontiguousarray(image))
+    if mipmaps:
+        glGenerateMipmap(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return texid
+
+
+class TextureManager:
+    """[Shared texture decoding and GL texture ownership for the model loaders]
+
+    Images are decoded on worker threads and identified by the sha1 of their file contents, so a
+    texture referenced by several materials, models or paths is decoded and uploaded once. Decoded
+    RGBA buffers stay in an LRU cache up to `cache_bytes`. GL textures are reference counted:
+    acquire() returns the shared id and release() deletes it when its last user lets go.
+    acquire() and release() issue GL calls and must run on the thread that owns the GL context.
+    """
+    def __init__(self, workers=4, cache_bytes=256 << 20, mipmaps=True):
+        """[Initialize]
+
+        Keyword Arguments:
+            workers {int} -- [decoding threads] (default: {4})
+            cache_bytes {int} -- [largest total size of the decoded images kept] (default: {256 MB})
+            mipmaps {bool} -- [upload textures with mipmaps] (default: {True})
+        """
+        self.cache_bytes = cache_bytes
+        self.mipmaps = mipmaps
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='texture')
+        self._lock = threading.Lock()
+        self._pending = {}             # path -> future of a decode in flight
+        self._digests = {}             # path -> (mtime, size, digest)
+        self._images = OrderedDict()   # digest -> decoded image, least recently used first
+        self._image_bytes = 0
+        self._textures = {}            # digest -> [texture id, references]
+        self._digest_of = {}           # texture id -> digest
+
+        # Counters
+        self.decoded = 0
+        self.reused = 0
+        self.uploaded = 0
+
+    def decode(self, path):
+        """[Start decoding an image file on a worker thread]
+
+        Arguments:
+            path {string} -- [image file]
+
+        Returns:
+            [Future] -- [resolves to (digest, image)]
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None:
+                return future
+            future = self._pending[path] = self._executor.submit(self._decode, path)
+        # Outside the lock: the callback runs right away when the decode has already finished.
+        future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def load(self, path):
+        """[Decode an image file and wait for the result, see decode]"""
+        return self.decode(path).result()
+
+    def _forget(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def _decode(self, path):
+        stat = os.stat(path)
+        with self._lock:
+            known = self._digests.get(path)
+            if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size) and known[2] in self._images:
+                self._images.move_to_end(known[2])
+                self.reused += 1
+                return known[2], self._images[known[2]]
+        with open(path, 'rb') as file:
+            data = file.read()
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            if digest in self._images:
+                # The same image under another path.
+                self._images.move_to_end(digest)
+                self.reused += 1
+                return digest, self._images[digest]
+        image = decode_texture(io.BytesIO(data), os.path.basename(path))
+        with self._lock:
+            self.decoded += 1
+            self._remember(digest, image)
+        return digest, image
+
+    def _remember(self, digest, image):
+        if digest in self._images:
+            return
+        self._images[digest] = image
+        self._image_bytes += image.nbytes
+        while self._image_bytes > self.cache_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._image_bytes -= evicted.nbytes
+
+    def acquire(self, digest, image=None):
+        """[Shared GL texture for an image, uploading it on first use]
+
+        Arguments:
+            digest {string} -- [content hash from decode or a compiled model]
+
+        Keyword Arguments:
+            image {[np.array]} -- [RGBA pixels, looked up in the decoded cache when None] (default: {None})
+
+        Returns:
+            [int] -- [texture id, to be handed back with release]
+        """
+        entry = self._textures.get(digest)
+        if entry is None:
+            if image is None:
+                with self._lock:
+                    image = self._images[digest]
+            texid = upload_texture(image, self.mipmaps)
+            entry = self._textures[digest] = [texid, 0]
+            self._digest_of[texid] = digest
+            self.uploaded += 1
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, texid):
+        """[Drop one reference to a texture from acquire, deleting it after the last one]"""
+        digest = self._digest_of.get(texid)
+        if digest is None:
+            return
+        entry = self._textures[digest]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            glDeleteTextures([texid])
+            del self._textures[digest], self._digest_of[texid]
+
+    def stats(self):
+        """[One-line summary of the manager]"""
+        return (f"{self.decoded} decoded, {self.reused} reused, {self.uploaded} uploaded, "
+                f"{len(self._textures)} live textures, {self._image_bytes / 2**20:.1f} MB decoded cache")
+
+
+class StreamingTexture:
+    """[Texture that is allocated once and refilled with every video frame]
+
+    update() copies a BGR frame straight from its NumPy buffer with glTexSubImage2D, so nothing is
+    converted or reallocated per frame; the texture storage is only reallocated when the frame size
+    changes. The first row of the frame lands at texture coordinate t = 0, draw the texture with t
+    growing downwards instead of flipping the frame. With pbo the frame is copied into one of two
+    alternating pixel buffer objects and the texture is filled from there, which lets the driver
+    transfer it asynchronously instead of stalling the render thread.
+    Must be used on the thread that owns the GL context.
+    """
+    def __init__(self, pbo=False):
+        """[Initialize]
+
+        Keyword Arguments:
+            pbo {bool} -- [upload through double-buffered pixel buffer objects] (default: {False})
+        """
+        self.texid = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texid)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.pbos = list(glGenBuffers(2)) if pbo else []
+        self.size = None
+        self.frames = 0
+
+    def _allocate(self, width, height):
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB8, width, height, 0, GL_BGR, GL_UNSIGNED_BYTE, None)
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, width * height * 3, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self.size = (width, height)
+
+    def update(self, image):
+        """[Replace the texture contents with a frame]
+
+        Arguments:
+            image {[np.array]} -- [(height, width, 3) BGR uint8 frame]
+        """
+        height, width = image.shape[:2]
+        image = np.ascontiguousarray(image)
+        glBindTexture(GL_TEXTURE_2D, self.texid)
+        if self.size != (width, height):
+            self._allocate(width, height)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        if self.pbos:
+            # Write into the buffer the previous frame did not use, so the copy does not wait for
+            # the transfer still reading the other one.
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self.pbos[self.frames % 2])
+            pointer = glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, image.nbytes,
+                                       GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT)
+            ctypes.memmove(pointer, image.ctypes.data, image.nbytes)
+            glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_BGR, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_BGR, GL_UNSIGNED_BYTE, image)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.frames += 1
+
+    def release(self):
+        """[Delete the texture and the pixel buffer objects]"""
+        glDeleteTextures([self.texid])
+        if self.pbos:
+            glDeleteBuffers(2, self.pbos)
+        self.texid, self.pbos, self.size = None, [], None
@@ -0,0 +1,114 @@
+import hashlib
+import os
+
+import cv2 as cv
+import numpy as np
+
+
+def calibration_fingerprint(camera_matrix, dist_coeffs):
+    """[Short hash identifying a calibration, used to tell stale undistortion maps apart]"""
+    digest = hashlib.sha1(np.ascontiguousarray(camera_matrix, np.float64).tobytes())
+    digest.update(np.ascontiguousarray(dist_coeffs, np.float64).ravel().tobytes())
+    return digest.hexdigest()[:12]
+
+
+def build_undistort_maps(camera_matrix, dist_coeffs, size, alpha=1.0):
+    """[Compute the optimal new camera matrix, its valid ROI and fixed-point remap tables]
+
+    Arguments:
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+        dist_coeffs {[np.array]} -- [distortion coefficients]
+        size {[tuple]} -- [(width, height) of the frames]
+
+    Keyword Arguments:
+        alpha {float} -- [free scaling passed to getOptimalNewCameraMatrix] (default: {1.0})
+
+    Returns:
+        [tuple] -- [(map1 CV_16SC2, map2 CV_16UC1, new_camera_matrix, roi)]
+    """
+    size = tuple(int(v) for v in size)
+    new_camera_matrix, roi = cv.getOptimalNewCameraMatrix(camera_matrix, dist_coeffs, size, alpha, size)
+    map1, map2 = cv.initUndistortRectifyMap(camera_matrix, dist_coeffs, None, new_camera_matrix, size, cv.CV_16SC2)
+    return map1, map2, new_camera_matrix, tuple(int(v) for v in roi)
+
+
+def undistort_maps(camera_matrix, dist_coeffs, size, alpha=1.0, maps_dir='calibration_maps'):
+    """[Load precomputed undistortion state for a resolution and alpha, building it on first use]
+
+    The maps are stored next to the calibration as plain .npy files and memory-mapped on load,
+    so even 4K tables are available in milliseconds. Entries whose calibration fingerprint no
+    longer matches are replaced.
+
+    Arguments:
+        camera_matrix {[np.array]} -- [camera intrinsic matrix]
+        dist_coeffs {[np.array]} -- [distortion coefficients]
+        size {[tuple]} -- [(width, height) of the frames]
+
+    Keyword Arguments:
+        alpha {float} -- [free scaling passed to getOptimalNewCameraMatrix] (default: {1.0})
+        maps_dir {string} -- [directory of the stored maps, None disables storage] (default: {'calibration_maps'})
+
+    Returns:
+        [tuple] -- [(map1 CV_16SC2, map2 CV_16UC1, new_camera_matrix, roi)]
+    """
+    if maps_dir is None:
+        return build_undistort_maps(camera_matrix, dist_coeffs, size, alpha)
+
+    fingerprint = calibration_fingerprint(camera_matrix, dist_coeffs)
+    key = f"{int(size[0])}x{int(size[1])}_a{alpha:g}"
+    prefix = os.path.join(maps_dir, f"{fingerprint}_{key}")
+    try:
+        with np.load(prefix + '_meta.npz') as meta:
+            new_camera_matrix, roi = meta['new_camera_matrix'], tuple(int(v) for v in meta['roi'])
+        map1 = np.load(prefix + '_map1.npy', mmap_mode='r')
+        map2 = np.load(prefix + '_map2.npy', mmap_mode='r')
+        return map1, map2, new_camera_matrix, roi
+    except (OSError, KeyError, ValueError):
+        pass
+
+    map1, map2, new_camera_matrix, roi = build_undistort_maps(camera_matrix, dist_coeffs, size, alpha)
+    os.makedirs(maps_dir, exist_ok=True)
+    # Maps of an older calibration for the same resolution and alpha are stale now.
+    for name in os.listdir(maps_dir):
+        if name.split('_', 1)[-1].startswith(key + '_') and not name.startswith(fingerprint):
+            os.remove(os.path.join(maps_dir, name))
+    np.save(prefix + '_map1.npy', map1)
+    np.save(prefix + '_map2.npy', map2)
+    # The metadata is written last, so an interrupted write never looks complete.
+    np.savez(prefix + '_meta.npz', new_camera_matrix=new_camera_matrix, roi=np.array(roi))
+    return map1, map2, new_camera_matrix, roi
+
+
+class Undistorter:
+    """[Remap-based undistortion that only computes the valid ROI]
+
+    The fixed-point maps are built (or loaded) once and cut down to the ROI, so pixels that would
+    be cropped away are never interpolated. Every call writes into the same preallocated buffer;
+    copy the result if it has to outlive the next call.
+    """
+    def __init__(self, camera_matrix, dist_coeffs, size, alpha=1.0, crop=True, channels=3, maps_dir='calibration_maps'):
+        """[Initialize]
+
+        Arguments:
+            camera_matrix {[np.array]} -- [camera intrinsic matrix]
+            dist_coeffs {[np.array]} -- [distortion coefficients]
+            size {[tuple]} -- [(width, height) of the frames]
+
+        Keyword Arguments:
+            alpha {float} -- [free scaling passed to getOptimalNewCameraMatrix] (default: {1.0})
+            crop {bool} -- [only produce the valid ROI] (default: {True})
+            channels {int} -- [channels of the input frames] (default: {3})
+            maps_dir {string} -- [directory of precomputed maps, see undistort_maps] (default: {'calibration_maps'})
+        """
+        map1, map2, self.new_camera_matrix, self.roi = undistort_maps(camera_matrix, dist_coeffs, size, alpha, maps_dir)
+        x, y, w, h = self.roi
+        if crop and w > 0 and h > 0:
+            map1, map2 = map1[y:y+h, x:x+w], map2[y:y+h, x:x+w]
+        self.map1 = np.ascontiguousarray(map1)
+        self.map2 = np.ascontiguousarray(map2)
+        shape = self.map1.shape[:2] + ((channels,) if channels > 1 else ())
+        self.output = np.empty(shape, np.uint8)
+
+    def __call__(self, frame):
+        """[Undistort one frame into the preallocated output buffer and return it]"""
+        return cv.remap(frame, self.map1, self.map2, cv.INTER_LINEAR, dst=self.output)
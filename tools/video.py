@@ -0,0 +1,73 @@
+import cv2 as cv
+import numpy as np
+
+
+def video_frames(path, step=1):
+    """[Decode a video file lazily, one frame at a time]
+
+    Arguments:
+        path {[string]} -- [path of the video file]
+
+    Keyword Arguments:
+        step {int} -- [yield every `step`-th frame; the others are grabbed but not retrieved] (default: {1})
+
+    Yields:
+        [tuple] -- [(frame index, BGR frame)]
+    """
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{path}'")
+    try:
+        index = 0
+        while True:
+            if index % step:
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield index, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def sharpness(gray):
+    """[Variance of the Laplacian, low values mean a blurred image]"""
+    return cv.Laplacian(gray, cv.CV_64F).var()
+
+
+def candidate_frames(frames, thumb_width=320, max_motion=4.0, min_change=12.0, min_sharpness=60.0):
+    """[Filter a frame stream down to sharp, steady frames that show a new board pose]
+
+    All scores are computed on a small grayscale thumbnail, so rejected frames cost little more
+    than their decoding. Only the current frame and two thumbnails are held at any time.
+
+    Arguments:
+        frames {[iterable]} -- [(index, BGR frame) pairs, e.g. from video_frames]
+
+    Keyword Arguments:
+        thumb_width {int} -- [width of the scoring thumbnail] (default: {320})
+        max_motion {float} -- [largest mean absolute difference to the previous frame, rejects motion blur] (default: {4.0})
+        min_change {float} -- [smallest mean absolute difference to the last candidate, rejects repeated poses] (default: {12.0})
+        min_sharpness {float} -- [smallest Laplacian variance of the thumbnail] (default: {60.0})
+
+    Yields:
+        [tuple] -- [(index, BGR frame, full-resolution grayscale frame)]
+    """
+    previous, last_candidate = None, None
+    for index, frame in frames:
+        h, w = frame.shape[:2]
+        thumb = cv.cvtColor(cv.resize(frame, (thumb_width, max(1, h * thumb_width // w)),
+                                      interpolation=cv.INTER_AREA), cv.COLOR_BGR2GRAY)
+        steady = previous is None or np.mean(cv.absdiff(thumb, previous)) <= max_motion
+        previous = thumb
+        if not steady:
+            continue
+        if last_candidate is not None and np.mean(cv.absdiff(thumb, last_candidate)) < min_change:
+            continue
+        if sharpness(thumb) < min_sharpness:
+            continue
+        last_candidate = thumb
+        yield index, frame, cv.cvtColor(frame, cv.COLOR_BGR2GRAY)